@@ -0,0 +1,136 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpResponse,
+                         StreamingHttpResponse)
+from django.utils._os import safe_join
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, size):
+    """Один диапазон из заголовка Range: `(start, end)` включительно.
+
+    None, если заголовка нет или он нам не по силам (несколько
+    диапазонов); `ValueError` для диапазона за пределами файла.
+    """
+    match = RANGE_RE.match(header or '')
+    if match is None:
+        return None
+    start, end = match.groups()
+    if not start:
+        if not end:
+            return None
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        raise ValueError
+    return start, end
+
+
+class RangeFile:
+    """Обёртка, отдающая из файла только `length` байт."""
+
+    def __init__(self, file, length, block_size=64 * 1024):
+        self.file = file
+        self.remaining = length
+        self.block_size = block_size
+
+    def __iter__(self):
+        while self.remaining > 0:
+            chunk = self.file.read(min(self.block_size, self.remaining))
+            if not chunk:
+                break
+            self.remaining -= len(chunk)
+            yield chunk
+
+    def close(self):
+        self.file.close()
+
+
+def file_response(request, full_path, stat):
+    """Отдаёт файл сам Django, с поддержкой одного диапазона."""
+    try:
+        byte_range = parse_range(request.META.get('HTTP_RANGE'),
+                                 stat.st_size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+    file = open(full_path, 'rb')
+    if byte_range is None:
+        return FileResponse(file)
+    start, end = byte_range
+    file.seek(start)
+    response = StreamingHttpResponse(
+        RangeFile(file, end - start + 1), status=206)
+    response['Content-Length'] = end - start + 1
+    response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    return response
+
+
+def is_not_modified(request, etag, stat):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return if_none_match == etag
+    return not was_modified_since(
+        request.META.get('HTTP_IF_MODIFIED_SINCE'),
+        stat.st_mtime, stat.st_size)
+
+
+def offloaded_response(path, full_path):
+    """Пустой ответ, по которому файл отдаст прокси, или None."""
+    server = getattr(settings, 'MEDIA_SERVER', 'django')
+    response = HttpResponse()
+    if server == 'nginx':
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_PREFIX + quote(path))
+    elif server == 'apache':
+        response['X-Sendfile'] = full_path
+    else:
+        return None
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """Отдаёт файл из MEDIA_ROOT.
+
+    При `MEDIA_SERVER = 'nginx'` ответ пустой с `X-Accel-Redirect` на
+    internal-location `MEDIA_ACCEL_PREFIX`, при `'apache'` — с
+    `X-Sendfile`; тогда байты и диапазоны отдаёт прокси. Иначе файл
+    отдаёт сам Django. Заголовки кэширования и 304 — в любом режиме.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    etag = quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+    if is_not_modified(request, etag, stat):
+        response = HttpResponse(status=304)
+    else:
+        response = (offloaded_response(path, full_path)
+                    or file_response(request, full_path, stat))
+        content_type, encoding = mimetypes.guess_type(full_path)
+        response['Content-Type'] = (
+            content_type or 'application/octet-stream')
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = (
+        f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}')
+    response['Accept-Ranges'] = 'bytes'
+    return response
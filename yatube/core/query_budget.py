@@ -0,0 +1,87 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """View сделал больше SQL-запросов, чем объявил."""
+
+
+def query_budget(max_queries):
+    """Объявляет, сколько SQL-запросов может сделать view.
+
+    Бюджет хранится в атрибуте функции; `functools.wraps` других
+    декораторов переносит его наружу.
+    """
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def get_query_budget(view):
+    return getattr(view, 'query_budget', None)
+
+
+class QueryCounter:
+    """Считает запросы и их время на всех подключениях к БД."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self._stack = ExitStack()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+    def __enter__(self):
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+
+class QueryBudgetMiddleware:
+    """Отладочная проверка бюджета запросов у view.
+
+    Включается настройкой `QUERY_BUDGET_ENABLED` (по умолчанию равна
+    DEBUG). Превышение пишется в лог, а при `QUERY_BUDGET_RAISE`
+    поднимает `QueryBudgetExceeded`. Число запросов и их время
+    отдаются в заголовках ответа.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_BUDGET_ENABLED', settings.DEBUG):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.query_budget = None
+        with QueryCounter() as counter:
+            response = self.get_response(request)
+        response['X-Query-Count'] = counter.count
+        response['X-Query-Time'] = f'{counter.duration * 1000:.1f}ms'
+        budget = request.query_budget
+        if budget is not None and counter.count > budget:
+            message = (f'{request.path}: {counter.count} SQL-запросов '
+                       f'при бюджете {budget}')
+            if getattr(settings, 'QUERY_BUDGET_RAISE', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_query_budget(view_func)
@@ -0,0 +1,48 @@
+from urllib.parse import urlsplit
+
+from django.core.cache import cache
+from django.urls import resolve
+
+from .query_budget import QueryCounter, get_query_budget
+
+
+class QueryBudgetTestMixin:
+    """Проверки бюджетов запросов для `TestCase`.
+
+    Кэш очищается перед каждым запросом, чтобы считать запросы
+    страницы, а не попадания в кэш. Запрос задаётся адресом (GET) или
+    парой `(адрес, данные)` для POST; данные могут быть функцией,
+    если их нельзя отправить дважды (файлы).
+    """
+
+    def count_queries(self, client, url, data=None):
+        cache.clear()
+        if callable(data):
+            data = data()
+        with QueryCounter() as counter:
+            if data is None:
+                client.get(url)
+            else:
+                client.post(url, data)
+        return counter.count
+
+    def assertWithinBudget(self, client, url, data=None):
+        """Страница укладывается в бюджет своего view; возвращает
+        число запросов.
+        """
+        if isinstance(url, tuple):
+            url, data = url
+        budget = get_query_budget(resolve(urlsplit(url).path).func)
+        self.assertIsNotNone(budget, f'{url}: бюджет запросов не объявлен')
+        count = self.count_queries(client, url, data)
+        self.assertLessEqual(
+            count, budget, f'{url}: {count} запросов при бюджете {budget}')
+        return count
+
+    def assertConstantQueries(self, client, urls, grow):
+        """Число запросов не растёт, когда `grow()` добавляет данные."""
+        before = [self.assertWithinBudget(client, url) for url in urls]
+        grow()
+        for url, count in zip(urls, before):
+            with self.subTest(request=url):
+                self.assertEqual(self.assertWithinBudget(client, url), count)
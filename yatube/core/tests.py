@@ -0,0 +1,109 @@
+import os
+import shutil
+import tempfile
+from http import HTTPStatus
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+
+from .query_budget import (QueryBudgetExceeded, QueryBudgetMiddleware,
+                           query_budget)
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@query_budget(1)
+def two_queries_view(request):
+    User.objects.count()
+    User.objects.exists()
+    return HttpResponse()
+
+
+@override_settings(QUERY_BUDGET_ENABLED=True)
+class QueryBudgetMiddlewareTests(TestCase):
+    def get_response(self):
+        request = RequestFactory().get('/')
+        middleware = QueryBudgetMiddleware(lambda request: (
+            middleware.process_view(request, two_queries_view, (), {})
+            or two_queries_view(request)))
+        return middleware(request)
+
+    def test_counts_queries(self):
+        """Число запросов отдаётся в заголовке, превышение — в лог."""
+        with self.assertLogs('core.query_budget', 'WARNING'):
+            response = self.get_response()
+        self.assertEqual(response['X-Query-Count'], '2')
+
+    @override_settings(QUERY_BUDGET_RAISE=True)
+    def test_raises_over_budget(self):
+        """При QUERY_BUDGET_RAISE превышение бюджета — ошибка."""
+        with self.assertRaises(QueryBudgetExceeded):
+            self.get_response()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, MEDIA_SERVER='django')
+class MediaViewTests(TestCase):
+    content = bytes(range(256)) * 4
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'), exist_ok=True)
+        with open(os.path.join(TEMP_MEDIA_ROOT, 'posts', 'a.jpg'),
+                  'wb') as file:
+            file.write(cls.content)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.url = f'{settings.MEDIA_URL}posts/a.jpg'
+
+    def test_serves_file_with_cache_headers(self):
+        """Файл отдаётся с валидаторами и заголовками кэширования."""
+        response = self.client.get(self.url)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('max-age', response['Cache-Control'])
+        self.assertIn('Last-Modified', response)
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_range_requests(self):
+        """Поддерживается один диапазон байт."""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, HTTPStatus.PARTIAL_CONTENT)
+        self.assertEqual(b''.join(response.streaming_content),
+                         self.content[10:20])
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-4')
+        self.assertEqual(b''.join(response.streaming_content),
+                         self.content[-4:])
+        response = self.client.get(self.url, HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code,
+                         HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+
+    @override_settings(MEDIA_SERVER='nginx')
+    def test_nginx_gets_accel_redirect(self):
+        """Для nginx файл отдаёт прокси по X-Accel-Redirect."""
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'],
+                         f'{settings.MEDIA_ACCEL_PREFIX}posts/a.jpg')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+    def test_paths_outside_media_root_are_not_found(self):
+        """Пути вне MEDIA_ROOT и каталоги не отдаются."""
+        for path in ('../manage.py', 'posts/', 'posts/missing.jpg'):
+            with self.subTest(path=path):
+                response = self.client.get(f'{settings.MEDIA_URL}{path}')
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
@@ -1,10 +1,73 @@
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.forms import BaseModelFormSet
 
 from .models import Group, Post
+from .paginators import EstimatedCountPaginator
+from .search import filter_matching
+
+
+class PreloadedAutocompleteSelect(AutocompleteSelect):
+    """Автодополнение, которое может взять выбранный объект готовым.
+
+    Если в `objects` лежит уже загруженный выбранный объект, подпись
+    строится по нему, без запроса за каждой строкой списка.
+    """
+
+    objects = None
+
+    def optgroups(self, name, value, attr=None):
+        selected = {str(v) for v in value}
+        if self.objects is None or {
+                str(obj.pk) for obj in self.objects} != selected - {''}:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        for obj in self.objects:
+            options.append(self.create_option(
+                name, obj.pk, self.choices.field.label_from_instance(obj),
+                True, len(options)))
+        return [(None, options, 0)]
+
+
+class PreloadedFormSet(BaseModelFormSet):
+    """Формы списка берут выбранные в автодополнении объекты из
+    связей строки, загруженных `list_select_related`.
+    """
+
+    def _construct_form(self, i, **kwargs):
+        form = super()._construct_form(i, **kwargs)
+        for name, field in form.fields.items():
+            widget = getattr(field.widget, 'widget', field.widget)
+            if isinstance(widget, PreloadedAutocompleteSelect):
+                related = getattr(form.instance, name)
+                widget.objects = [related] if related else []
+        return form
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список объектов без точных COUNT(*) по всей таблице и без
+    запроса на каждое поле автодополнения в `list_editable`.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.get_autocomplete_fields(request):
+            kwargs.setdefault('widget', PreloadedAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using')))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_formset(self, request, **kwargs):
+        kwargs.setdefault('formset', PreloadedFormSet)
+        return super().get_changelist_formset(request, **kwargs)
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(LargeTableAdmin):
     """Модель для админа сайта."""
 
     list_display = (
@@ -15,14 +78,25 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по тексту через полнотекстовый индекс вместо LIKE."""
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        return filter_matching(queryset, search_term), False
+
 
 @admin.register(Group)
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(LargeTableAdmin):
     """Модель для управления группами в админке."""
 
     list_display = ('title', 'slug', 'description')
+    search_fields = ('title', 'slug')
     empty_value_display = '-пусто-'
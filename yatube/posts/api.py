@@ -0,0 +1,134 @@
+from django.core.files.storage import default_storage
+from django.http import JsonResponse
+
+from core.query_budget import query_budget
+
+from . import constants
+from .caching import author_scope, cache_versioned, group_scope
+from .models import Group, Post, User
+from .paginators import KeysetPaginator
+from .views import post_detail_scopes
+
+# Поле ответа -> путь для `values()`.
+API_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+# Ключи курсора выбираются всегда, даже если их не просили.
+CURSOR_KEYS = ('pub_date', 'id')
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def parse_fields(request):
+    """Запрошенные через `?fields=` поля ответа, по умолчанию все."""
+    value = request.GET.get('fields')
+    if not value:
+        return tuple(API_FIELDS)
+    fields = tuple(dict.fromkeys(
+        name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in API_FIELDS]
+    if unknown or not fields:
+        raise FieldsError(
+            f'Неизвестные поля: {", ".join(unknown)}. '
+            f'Доступны: {", ".join(API_FIELDS)}.')
+    return fields
+
+
+def serialize(row, fields):
+    """Строку `values()` в словарь ответа, минуя экземпляры моделей."""
+    data = {name: row[API_FIELDS[name]] for name in fields}
+    if 'image' in data:
+        data['image'] = (default_storage.url(data['image'])
+                         if data['image'] else None)
+    return data
+
+
+def error_response(message, status=400):
+    return JsonResponse({'detail': message}, status=status,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def page_url(request, **params):
+    query = request.GET.copy()
+    for name in ('after', 'before', 'page'):
+        query.pop(name, None)
+    query.update(params)
+    return request.build_absolute_uri(f'?{query.urlencode()}')
+
+
+def feed_response(request, post_list):
+    """Страница ленты в JSON; листается курсорами `after`/`before`.
+
+    Выбираются только столбцы запрошенных полей и ключи курсора.
+    """
+    try:
+        fields = parse_fields(request)
+    except FieldsError as error:
+        return error_response(str(error))
+    columns = {API_FIELDS[name] for name in fields} | set(CURSOR_KEYS)
+    paginator = KeysetPaginator(
+        post_list.values(*columns), constants.POSTS_PER_PAGE)
+    page = paginator.get_cursor_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    return JsonResponse({
+        'results': [serialize(row, fields) for row in page],
+        'next': page.next_cursor and page_url(
+            request, after=page.next_cursor),
+        'previous': page.previous_cursor and page_url(
+            request, before=page.previous_cursor),
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+@query_budget(3)
+@cache_versioned(lambda: ('index',), personal=False)
+def api_index(request):
+    """Главная лента в JSON."""
+    return feed_response(request, Post.objects.all())
+
+
+@query_budget(4)
+@cache_versioned(lambda slug: (group_scope(slug),), personal=False)
+def api_group_posts(request, slug):
+    """Лента группы в JSON."""
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True).first()
+    if group_id is None:
+        return error_response('Группа не найдена.', status=404)
+    return feed_response(request, Post.objects.filter(group_id=group_id))
+
+
+@query_budget(4)
+@cache_versioned(lambda username: (author_scope(username),), personal=False)
+def api_profile(request, username):
+    """Посты автора в JSON."""
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    if author_id is None:
+        return error_response('Автор не найден.', status=404)
+    return feed_response(request, Post.objects.filter(author_id=author_id))
+
+
+@query_budget(4)
+@cache_versioned(post_detail_scopes, personal=False)
+def api_post_detail(request, post_id):
+    """Отдельный пост в JSON."""
+    try:
+        fields = parse_fields(request)
+    except FieldsError as error:
+        return error_response(str(error))
+    row = Post.objects.filter(pk=post_id).values(
+        *{API_FIELDS[name] for name in fields}).first()
+    if row is None:
+        return error_response('Пост не найден.', status=404)
+    return JsonResponse(serialize(row, fields),
+                        json_dumps_params={'ensure_ascii': False})
@@ -0,0 +1,166 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
+
+from . import constants
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def author_scope(username):
+    return f'author:{username}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def version_key(scope):
+    return f'cache_version:{scope}'
+
+
+def modified_key(scope):
+    return f'cache_modified:{scope}'
+
+
+def new_version():
+    """Начальная версия, которая не совпадёт с вытесненной из кэша."""
+    return time.time_ns()
+
+
+def get_versions(scopes):
+    """Текущие версии областей одним обращением к кэшу."""
+    keys = [version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*scopes):
+    """Делает устаревшими все страницы, зависящие от областей."""
+    for scope in set(scopes):
+        try:
+            cache.incr(version_key(scope))
+        except ValueError:
+            cache.set(version_key(scope), new_version(), None)
+    now = time.time()
+    cache.set_many({modified_key(scope): now for scope in scopes}, None)
+
+
+def modified_at(scopes):
+    """Время последней смены версии любой из областей.
+
+    Неизвестное время считается текущим: после вытеснения из кэша
+    лучше один раз отдать страницу целиком, чем ответить 304 зря.
+    """
+    keys = [modified_key(scope) for scope in scopes]
+    times = cache.get_many(keys)
+    missing = {key: time.time() for key in keys if key not in times}
+    if missing:
+        cache.set_many(missing, None)
+        times.update(missing)
+    return datetime.fromtimestamp(max(times.values()), timezone.utc)
+
+
+def viewer_key(request):
+    """Часть ключа кэша и ETag, по которой различаются читатели.
+
+    Страница вошедшего содержит его CSRF-токен, поэтому она хранится
+    вместе с хэшем CSRF-cookie: токен из кэша подходит к cookie этого
+    браузера и устаревает при её смене после входа.
+    """
+    if not request.user.is_authenticated:
+        return 'anonymous'
+    get_token(request)
+    token = request.META['CSRF_COOKIE']
+    digest = hashlib.sha256(token.encode()).hexdigest()[:16]
+    return f'{request.user.pk}-{digest}'
+
+
+def cache_versioned(get_scopes, timeout=constants.PAGE_CACHE_TIMEOUT,
+                    personal=True):
+    """Как `cache_page`, но ключ включает версии областей страницы.
+
+    `get_scopes` получает аргументы view и возвращает области, от
+    которых зависит страница. Сигналы повышают версии при записи, так
+    что старые записи кэша просто перестают читаться, а таймаут можно
+    держать большим. Из тех же версий и читателя собирается ETag:
+    на совпавший `If-None-Match` отвечаем 304 без запросов страницы.
+
+    Таймаут касается только серверного кэша: браузерам и прокси
+    отдаётся `private, no-cache`, чтобы они сверяли ETag на каждом
+    запросе и видели запись сразу.
+
+    `cache_page` в роли декоратора view не видит `Vary: Cookie`, поэтому
+    страница с `personal=True` (шапка, кнопки, формы) кэшируется
+    отдельно для каждого читателя (`viewer_key`), а ETag меняется
+    вместе с ключом кэша. `personal=False` — одна копия на всех.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            scopes = ('site', *get_scopes(*args, **kwargs))
+            versions = '.'.join(map(str, get_versions(scopes)))
+            viewer = viewer_key(request) if personal else 'all'
+            etag = f'{view.__name__}-{versions}-{viewer}'
+            cached_view = cache_page(
+                timeout,
+                key_prefix=f'{view.__name__}:{versions}:{viewer}',
+            )(view)
+            conditional_view = condition(
+                etag_func=lambda *args, **kwargs: etag)(cached_view)
+            response = conditional_view(request, *args, **kwargs)
+            del response['Expires']
+            response['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+def card_key(post, versions, in_group):
+    scope = 'group' if in_group else 'feed'
+    return f'post_card:{post.pk}:{scope}:{".".join(map(str, versions))}'
+
+
+def render_post_cards(posts, group=None, prepare=None):
+    """HTML карточек постов страницы.
+
+    Карточка не зависит от читателя, поэтому одна копия служит всем
+    лентам. Версии и готовые карточки читаются двумя `get_many`,
+    отрисовываются и сохраняются только промахи; перед отрисовкой
+    `prepare` получает посты-промахи разом.
+    """
+    posts = list(posts)
+    scopes = ['site', *(post_scope(post.pk) for post in posts)]
+    site_version, *post_versions = get_versions(scopes)
+    keys = [
+        card_key(post, (site_version, version),
+                 group is not None and post.group_id == group.pk)
+        for post, version in zip(posts, post_versions)
+    ]
+    cards = cache.get_many(keys)
+    if prepare is not None:
+        prepare([post for post, key in zip(posts, keys)
+                 if key not in cards])
+    missing = {}
+    for post, key in zip(posts, keys):
+        if key not in cards:
+            missing[key] = cards[key] = render_to_string(
+                'posts/includes/post_card.html',
+                {'post': post, 'group': group},
+            )
+    if missing:
+        cache.set_many(missing, constants.PAGE_CACHE_TIMEOUT)
+    return [cards[key] for key in keys]
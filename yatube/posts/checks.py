@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+PER_PROCESS_CACHES = (
+    'django.core.cache.backends.dummy.DummyCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Версии страниц живут в кэше и должны быть общими для процессов.
+
+    Иначе запись устаревает страницы только в обработавшем её
+    процессе, остальные отдают старые копии до конца таймаута.
+    """
+    if settings.CACHES['default']['BACKEND'] in PER_PROCESS_CACHES:
+        return [Error(
+            'Кэш по умолчанию не общий для процессов: страницы '
+            'устаревают только в процессе, принявшем запись.',
+            hint='Задайте memcached в CACHE_BACKEND и CACHE_LOCATION.',
+            id='posts.E001',
+        )]
+    return []
@@ -1,4 +1,35 @@
 POSTS_PER_PAGE = 10
 POSTS_PER_SECOND_PAGE = 3
 SYMBOLS_IN_SELF_TEXT = 30
-CASH_TIME_FOR_INDEX_PAGE_IN_SECONDS = 60 / 3
+COMMENTS_PER_PAGE = 20
+PAGE_CACHE_TIMEOUT = 60 * 60 * 3
+FEED_COUNT_CACHE_TIMEOUT = 60 * 60
+EXACT_COUNT_LIMIT = 100000
+PAGES_ON_EACH_SIDE = 2
+TIMELINE_MAX_ENTRIES = 1000
+TIMELINE_PULL = 'pull'
+TIMELINE_PUSH = 'push'
+TIMELINE_HYBRID = 'hybrid'
+TIMELINE_MODE = TIMELINE_HYBRID
+TIMELINE_PUSH_FOLLOWERS_LIMIT = 10000
+THUMBNAIL_GEOMETRIES = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_LRU_SIZE = 10000
+IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+IMAGE_MAX_PIXELS = 50_000_000
+IMAGE_MAX_DECODED_PIXELS = 16_000_000
+IMAGE_MAX_SIDE = 1920
+IMAGE_QUALITY = 85
+IMAGE_SPOOL_SIZE = 1024 * 1024
+IMAGE_VARIANT_WIDTHS = (480, 960, 1440)
+IMAGE_VARIANT_ASPECT = (960, 339)
+IMAGE_VARIANT_FORMATS = ('WEBP', 'JPEG')
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_GC_GRACE = 60 * 60 * 24
+EXPORT_BATCH_SIZE = 1000
+FEED_ITEMS = 20
+GROUP_RECENT_DAYS = 7
+GROUPS_PER_PAGE = 50
+SEARCH_CANDIDATES = 1000
@@ -0,0 +1,114 @@
+import csv
+import json
+
+from . import constants
+from .models import Comment, Post
+from .paginators import KeysetPaginator
+
+# Поле записи -> путь для `values()`.
+POST_COLUMNS = {
+    'id': 'id',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'image': 'image',
+}
+COMMENT_COLUMNS = {
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+CSV_HEADER = ('type', 'id', 'post', 'author', 'group', 'text',
+              'pub_date', 'created', 'image')
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def image_storage_url(name):
+    return Post._meta.get_field('image').storage.url(name)
+
+
+def post_batches(posts, batch_size):
+    """Посты пачками от старых к новым.
+
+    Следующая пачка выбирается по ключу `(pub_date, id)` последнего
+    поста, поэтому каждый запрос — короткий проход по индексу без
+    OFFSET, сколько бы постов ни было.
+    """
+    paginator = KeysetPaginator(posts.values(*POST_COLUMNS.values()),
+                                batch_size, keys=('pub_date', 'id'))
+    values = None
+    while True:
+        batch = list(paginator.seek(
+            paginator.object_list, values, True)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        values = [batch[-1][key] for key in paginator.keys]
+
+
+def post_record(row, image_url):
+    record = {'type': 'post'}
+    record.update(
+        (name, row[column]) for name, column in POST_COLUMNS.items())
+    record['pub_date'] = record['pub_date'].isoformat()
+    if image_url is None:
+        del record['image']
+    else:
+        record['image'] = (image_url(record['image'])
+                           if record['image'] else None)
+    return record
+
+
+def comment_records(post_ids, batch_size):
+    comments = Comment.objects.filter(post_id__in=post_ids).order_by(
+        'post_id', 'created', 'id').values_list(*COMMENT_COLUMNS.values())
+    for values in comments.iterator(chunk_size=batch_size):
+        record = {'type': 'comment', **dict(zip(COMMENT_COLUMNS, values))}
+        record['created'] = record['created'].isoformat()
+        yield record
+
+
+def export_records(posts, comments=False, image_url=None,
+                   batch_size=constants.EXPORT_BATCH_SIZE):
+    """Записи выгрузки постов, за каждой пачкой — их комментарии.
+
+    Формат записей тот же, что читает `import_yatube`. В памяти
+    держится одна пачка постов; `image_url` превращает имя файла
+    картинки в ссылку, без него картинки не выгружаются.
+    """
+    for batch in post_batches(posts, batch_size):
+        for row in batch:
+            yield post_record(row, image_url)
+        if comments:
+            yield from comment_records(
+                [row['id'] for row in batch], batch_size)
+
+
+def jsonl_lines(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+class Echo:
+    """Псевдофайл для `csv.writer`: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(records):
+    writer = csv.DictWriter(Echo(), CSV_HEADER)
+    yield writer.writeheader()
+    for record in records:
+        yield writer.writerow(record)
+
+
+WRITERS = {
+    'jsonl': jsonl_lines,
+    'csv': csv_lines,
+}
@@ -0,0 +1,140 @@
+from django.contrib.syndication.views import Feed
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.views.decorators.http import condition
+
+from core.query_budget import query_budget
+
+from . import constants
+from .caching import author_scope, cache_versioned, group_scope, modified_at
+from .models import Group, Post, User
+
+FEED_TYPES = {
+    'rss': Rss201rev2Feed,
+    'atom': Atom1Feed,
+}
+
+
+class LatestPostsFeed(Feed):
+    """Последние посты сайта."""
+
+    title = 'Yatube: последние записи'
+    description = 'Новые записи всех авторов.'
+
+    def __init__(self, feed_type):
+        self.feed_type = feed_type
+
+    def __call__(self, request, *args, **kwargs):
+        response = super().__call__(request, *args, **kwargs)
+        # Дата свежего поста не меняется при правке и удалении,
+        # Last-Modified ставит `cache_feed` по версиям кэша.
+        del response['Last-Modified']
+        return response
+
+    def link(self):
+        return reverse('posts:index')
+
+    def get_posts(self, obj):
+        return Post.objects.all()
+
+    def items(self, obj):
+        return self.get_posts(obj).select_related(
+            'author')[:constants.FEED_ITEMS]
+
+    def item_title(self, item):
+        return str(item)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=(item.pk,))
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+
+class GroupPostsFeed(LatestPostsFeed):
+    """Последние посты группы."""
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, obj):
+        return f'Yatube: {obj.title}'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('posts:group_list', args=(obj.slug,))
+
+    def get_posts(self, obj):
+        return obj.posts.all()
+
+
+class AuthorPostsFeed(LatestPostsFeed):
+    """Последние посты автора."""
+
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f'Yatube: {obj.get_full_name() or obj.username}'
+
+    def description(self, obj):
+        return f'Новые записи автора {obj.username}.'
+
+    def link(self, obj):
+        return reverse('posts:profile', args=(obj.username,))
+
+    def get_posts(self, obj):
+        return obj.posts.all()
+
+
+def render_feed(feed_class, request, kind, *args):
+    feed_type = FEED_TYPES.get(kind)
+    if feed_type is None:
+        raise Http404
+    return feed_class(feed_type)(request, *args)
+
+
+def cache_feed(get_scopes):
+    """`cache_versioned` для лент с Last-Modified по времени смены версий.
+
+    Лента собирается один раз на версию содержимого, а на
+    `If-Modified-Since` отвечаем 304 до обращения к кэшу страниц.
+    """
+    def last_modified(request, *args, **kwargs):
+        return modified_at(('site', *get_scopes(*args, **kwargs)))
+
+    def decorator(view):
+        return condition(last_modified_func=last_modified)(
+            cache_versioned(get_scopes, personal=False)(view))
+    return decorator
+
+
+@query_budget(3)
+@cache_feed(lambda kind: ('index',))
+def index_feed(request, kind):
+    """RSS или Atom с последними постами сайта."""
+    return render_feed(LatestPostsFeed, request, kind)
+
+
+@query_budget(4)
+@cache_feed(lambda slug, kind: (group_scope(slug),))
+def group_feed(request, slug, kind):
+    """RSS или Atom с последними постами группы."""
+    return render_feed(GroupPostsFeed, request, kind, slug)
+
+
+@query_budget(4)
+@cache_feed(lambda username, kind: (author_scope(username),))
+def profile_feed(request, username, kind):
+    """RSS или Atom с последними постами автора."""
+    return render_feed(AuthorPostsFeed, request, kind, username)
@@ -1,5 +1,6 @@
 from django.forms import ModelForm
 
+from .images import process_upload
 from .models import Comment, Post
 
 
@@ -11,6 +12,12 @@ class PostForm(ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if image and 'image' in self.changed_data:
+            return process_upload(image)
+        return image
+
 
 class CommentForm(ModelForm):
     """Форма Comment для создания формы для работы с моделью User"""
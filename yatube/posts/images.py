@@ -0,0 +1,92 @@
+from tempfile import SpooledTemporaryFile
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import constants
+from .models import StoredImage
+
+# GIF не несёт EXIF, а пересжатие потеряло бы анимацию.
+PASSTHROUGH_FORMATS = ('GIF',)
+# Форматы, которые Pillow читает, но не пишет.
+SAVE_FORMATS = {'MPO': 'JPEG'}
+EXIF_ORIENTATION = 0x0112
+
+
+def fit_size(size, max_side):
+    """Размер картинки после `thumbnail((max_side, max_side))`."""
+    width, height = size
+    scale = min(1, max_side / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def open_upload(upload):
+    """Открывает загрузку, прочитав только заголовок картинки.
+
+    JPEG сразу настраивается на декодирование в уменьшенном масштабе
+    (`draft`), остальные форматы декодируются целиком. Поэтому кроме
+    `IMAGE_MAX_PIXELS` по заголовку проверяется и размер того, что
+    будет декодировано: `IMAGE_MAX_DECODED_PIXELS`.
+    """
+    if upload.size > constants.IMAGE_MAX_UPLOAD_SIZE:
+        raise ValidationError('Файл слишком большой.', code='file_too_big')
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except (Image.DecompressionBombError, OSError):
+        raise ValidationError('Не удалось прочитать изображение.',
+                              code='invalid_image')
+    width, height = image.size
+    if width * height > constants.IMAGE_MAX_PIXELS:
+        raise ValidationError('Слишком большое разрешение изображения.',
+                              code='too_many_pixels')
+    image.draft(image.mode, fit_size(image.size, constants.IMAGE_MAX_SIDE))
+    width, height = image.size
+    if width * height > constants.IMAGE_MAX_DECODED_PIXELS:
+        raise ValidationError('Слишком большое разрешение изображения.',
+                              code='too_many_pixels')
+    return image
+
+
+def process_upload(upload):
+    """Уменьшает загруженную картинку и убирает из неё метаданные.
+
+    Размеры проверяются по заголовку до декодирования (см.
+    `open_upload`), так что в памяти не больше
+    `IMAGE_MAX_DECODED_PIXELS` несжатых пикселей. Исходник читается
+    блоками, результат пишется в `SpooledTemporaryFile`.
+    """
+    image = open_upload(upload)
+    max_side = constants.IMAGE_MAX_SIDE
+    if (image.format in PASSTHROUGH_FORMATS
+            and max(image.size) <= max_side):
+        upload.seek(0)
+        return upload
+    image_format = SAVE_FORMATS.get(image.format, image.format)
+    icc_profile = image.info.get('icc_profile')
+    image.thumbnail((max_side, max_side))
+    if image.getexif().get(EXIF_ORIENTATION, 1) != 1:
+        # Без поворота `exif_transpose` всё равно копирует картинку.
+        image = ImageOps.exif_transpose(image)
+    image.info = {}
+    output = SpooledTemporaryFile(max_size=constants.IMAGE_SPOOL_SIZE)
+    options = {'quality': constants.IMAGE_QUALITY, 'optimize': True}
+    if icc_profile:
+        options['icc_profile'] = icc_profile
+    image.save(output, image_format, **options)
+    image.close()
+    output.seek(0)
+    return File(output, name=upload.name)
+
+
+def shift_image_refs(name, delta):
+    """Сдвигает счётчик ссылок на файл картинки."""
+    if not name:
+        return
+    if delta > 0:
+        StoredImage.objects.get_or_create(name=name)
+    StoredImage.objects.filter(name=name, refs__gte=-delta).update(
+        refs=F('refs') + delta, updated=timezone.now())
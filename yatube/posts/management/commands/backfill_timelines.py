@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.models import UserStats
+
+
+class Command(BaseCommand):
+    help = ('Раскладывает по лентам посты авторов, которые после отписок '
+            'снова укладываются в лимит гибридного режима. Запускайте '
+            'периодически (например, раз в несколько минут из cron).')
+
+    def handle(self, *args, **options):
+        author_ids = list(UserStats.objects.filter(
+            timeline_pulled=True).values_list('user_id', flat=True))
+        for author_id in author_ids:
+            timeline.backfill_pulled(author_id)
+        self.stdout.write(f'Авторов обработано: {len(author_ids)}')
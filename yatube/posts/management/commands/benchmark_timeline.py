@@ -0,0 +1,133 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from posts import constants, timeline
+from posts.models import Follow, Post, UserStats
+
+User = get_user_model()
+
+MODES = (
+    constants.TIMELINE_PULL,
+    constants.TIMELINE_PUSH,
+    constants.TIMELINE_HYBRID,
+)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает задержку ленты подписок в режимах pull, push и '
+            'hybrid на сгенерированных данных. Все данные создаются в '
+            'транзакции и откатываются после замера.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=300)
+        parser.add_argument('--authors', type=int, default=50)
+        parser.add_argument('--celebrities', type=int, default=3)
+        parser.add_argument('--follows', type=int, default=20,
+                            help='Обычных авторов в подписках читателя.')
+        parser.add_argument('--posts', type=int, default=30,
+                            help='Постов у каждого автора.')
+        parser.add_argument('--samples', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.count_keys = []
+        try:
+            with transaction.atomic():
+                self.generate(options)
+                # Обычные авторы раскладываются по лентам, «звёзды» — нет.
+                self.push_limit = max(
+                    UserStats.objects.filter(
+                        user__in=self.regular).values_list(
+                            'followers', flat=True),
+                    default=0,
+                )
+                rows = [self.measure(mode, options) for mode in MODES]
+                transaction.set_rollback(True)
+        finally:
+            cache.delete_many(self.count_keys)
+        self.stdout.write(
+            f'{"mode":<8}{"write ms":>12}{"read ms":>12}{"read p95":>12}')
+        for mode, write, read, read_p95 in rows:
+            self.stdout.write(
+                f'{mode:<8}{write:>12.2f}{read:>12.2f}{read_p95:>12.2f}')
+
+    def generate(self, options):
+        prefix = f'benchmark_{time.time_ns()}'
+        User.objects.bulk_create(
+            User(username=f'{prefix}_author_{i}')
+            for i in range(options['authors']))
+        User.objects.bulk_create(
+            User(username=f'{prefix}_reader_{i}')
+            for i in range(options['readers']))
+        users = User.objects.filter(username__startswith=prefix)
+        self.authors = list(users.filter(username__contains='_author_'))
+        self.readers = list(users.filter(username__contains='_reader_'))
+        celebrities = self.authors[:options['celebrities']]
+        self.regular = self.authors[options['celebrities']:]
+        follows = []
+        for reader in self.readers:
+            followed = celebrities + self.random.sample(
+                self.regular, min(options['follows'], len(self.regular)))
+            follows.extend(
+                Follow(user=reader, author=author) for author in followed)
+        Follow.objects.bulk_create(follows, batch_size=500)
+        Post.objects.bulk_create(
+            (Post(author=author, text=f'{author.username} {i}')
+             for author in self.authors for i in range(options['posts'])),
+            batch_size=500,
+        )
+        followers = Follow.objects.filter(
+            author__in=self.authors).values('author_id').annotate(
+                total=Count('id'))
+        UserStats.objects.bulk_create(
+            UserStats(user_id=row['author_id'], followers=row['total'])
+            for row in followers
+        )
+        self.count_keys = [
+            f'benchmark_timeline:{reader.pk}' for reader in self.readers]
+
+    def measure(self, mode, options):
+        timeline.rebuild(
+            user_ids=[reader.pk for reader in self.readers], mode=mode,
+            push_limit=self.push_limit)
+        marker = f'benchmark {mode}'
+        Post.objects.bulk_create(
+            Post(author=author, text=marker)
+            for author in self.random.choices(
+                self.authors, k=options['samples']))
+        writes = []
+        for post in Post.objects.filter(text=marker):
+            started = time.perf_counter()
+            timeline.push_post(post, mode=mode, push_limit=self.push_limit)
+            writes.append(time.perf_counter() - started)
+        reads = []
+        for reader in self.random.choices(self.readers, k=options['samples']):
+            paginator = timeline.TimelinePaginator(
+                Post.objects.filter(
+                    author__following__user=reader).select_related(
+                        'author', 'group'),
+                constants.POSTS_PER_PAGE,
+                user=reader,
+                mode=mode,
+                push_limit=self.push_limit,
+                count_key=f'benchmark_timeline:{reader.pk}',
+            )
+            started = time.perf_counter()
+            page = paginator.get_cursor_page()
+            list(paginator.get_cursor_page(after=page.next_cursor))
+            reads.append(time.perf_counter() - started)
+        reads.sort()
+        return (
+            mode,
+            statistics.mean(writes) * 1000,
+            statistics.mean(reads) * 1000,
+            reads[int(len(reads) * 0.95) - 1] * 1000,
+        )
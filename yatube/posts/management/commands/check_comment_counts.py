@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F
+
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Сверяет сохранённое количество комментариев постов с '
+            'фактическим; с --fix исправляет расхождения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true')
+
+    def handle(self, *args, **options):
+        mismatched = Post.objects.annotate(
+            actual=Count('comments')).exclude(
+                comments_count=F('actual')).values_list(
+                    'pk', 'comments_count', 'actual').order_by('pk')
+        total = 0
+        for pk, stored, actual in mismatched:
+            total += 1
+            self.stdout.write(
+                f'Пост {pk}: сохранено {stored}, на деле {actual}')
+            if options['fix']:
+                Post.objects.filter(pk=pk).update(comments_count=actual)
+        if not total:
+            self.stdout.write('Расхождений нет')
+        elif options['fix']:
+            self.stdout.write(f'Исправлено постов: {total}')
+        else:
+            self.stderr.write(f'Постов с расхождениями: {total}')
@@ -0,0 +1,106 @@
+from datetime import timedelta
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from sorl.thumbnail import delete as delete_with_thumbnails
+
+from posts import constants
+from posts.models import Post, StoredImage
+from posts.storage import is_content_addressed
+
+
+class Command(BaseCommand):
+    help = ('Удаляет файлы картинок, на которые не ссылается ни один пост, '
+            'вместе с их миниатюрами. Трогает только файлы, которые '
+            'назвало по хэшу содержимого хранилище постов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument('--recount', action='store_true',
+                            help='Сначала пересчитать ссылки по постам.')
+        parser.add_argument('--grace', type=int,
+                            default=constants.IMAGE_GC_GRACE,
+                            help='Не трогать файлы моложе стольких секунд.')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            self.recount()
+        cutoff = timezone.now() - timedelta(seconds=options['grace'])
+        names = set(StoredImage.objects.filter(
+            refs=0, updated__lt=cutoff).values_list('name', flat=True))
+        names |= self.untracked_files(cutoff)
+        names -= set(Post.objects.filter(image__in=names).values_list(
+            'image', flat=True))
+        deleted = 0
+        for name in sorted(names):
+            if options['dry_run']:
+                self.stdout.write(name)
+                deleted += 1
+            elif self.delete_unused(name, cutoff):
+                self.stdout.write(name)
+                deleted += 1
+        verb = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(f'{verb} файлов: {deleted}')
+
+    def delete_unused(self, name, cutoff):
+        """Удаляет файл, если он всё ещё не нужен.
+
+        Между выборкой и удалением файл могли снова загрузить, поэтому
+        ссылки, счётчик и дата файла перепроверяются под блокировкой
+        записи `StoredImage`; повторная загрузка обновляет дату файла
+        (см. `ContentAddressedStorage`).
+        """
+        field = Post._meta.get_field('image')
+        with transaction.atomic():
+            stored = StoredImage.objects.select_for_update().filter(
+                name=name).first()
+            if stored is not None and (stored.refs
+                                       or stored.updated >= cutoff):
+                return False
+            if Post.objects.filter(image=name).exists():
+                return False
+            try:
+                if field.storage.get_modified_time(name) >= cutoff:
+                    return False
+            except FileNotFoundError:
+                pass
+            try:
+                delete_with_thumbnails(name)
+            except SuspiciousFileOperation:
+                pass
+            StoredImage.objects.filter(name=name).delete()
+        return True
+
+    def recount(self):
+        totals = dict(Post.objects.exclude(image='').values_list(
+            'image').annotate(total=Count('pk')).order_by())
+        for stored in StoredImage.objects.all():
+            refs = totals.pop(stored.name, 0)
+            if stored.refs != refs:
+                StoredImage.objects.filter(name=stored.name).update(
+                    refs=refs)
+        StoredImage.objects.bulk_create(
+            StoredImage(name=name, refs=refs)
+            for name, refs in totals.items())
+
+    def untracked_files(self, cutoff):
+        """Старые файлы хранилища постов без записи `StoredImage`.
+
+        Файлы с другими именами положил не `ContentAddressedStorage`,
+        и они не трогаются.
+        """
+        field = Post._meta.get_field('image')
+        directory = field.upload_to.rstrip('/')
+        try:
+            _, files = field.storage.listdir(directory)
+        except FileNotFoundError:
+            return set()
+        known = set(StoredImage.objects.values_list('name', flat=True))
+        return {
+            name for name in (f'{directory}/{file}' for file in files)
+            if is_content_addressed(name) and name not in known
+            and field.storage.get_modified_time(name) < cutoff
+        }
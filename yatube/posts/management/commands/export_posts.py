@@ -0,0 +1,55 @@
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import constants
+from posts.export import WRITERS, export_records, image_storage_url
+from posts.models import Group, User
+
+
+class Command(BaseCommand):
+    help = ('Потоком выгружает посты автора или группы в JSONL или CSV '
+            '(формат import_yatube), при желании с комментариями и '
+            'ссылками на картинки.')
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group()
+        source.add_argument('--author', help='Имя пользователя.')
+        source.add_argument('--group', help='Slug группы.')
+        parser.add_argument('--format', choices=tuple(WRITERS),
+                            default='jsonl')
+        parser.add_argument('--comments', action='store_true')
+        parser.add_argument('--images', action='store_true')
+        parser.add_argument('--output', default='-',
+                            help='Файл для выгрузки; «-» — stdout.')
+        parser.add_argument('--batch-size', type=int,
+                            default=constants.EXPORT_BATCH_SIZE)
+
+    def get_posts(self, options):
+        if options['author']:
+            author = User.objects.filter(username=options['author']).first()
+            if author is None:
+                raise CommandError('Автор не найден.')
+            return author.posts.all()
+        if not options['group']:
+            raise CommandError('Укажите --author или --group.')
+        group = Group.objects.filter(slug=options['group']).first()
+        if group is None:
+            raise CommandError('Группа не найдена.')
+        return group.posts.all()
+
+    def handle(self, *args, **options):
+        records = export_records(
+            self.get_posts(options),
+            comments=options['comments'],
+            image_url=image_storage_url if options['images'] else None,
+            batch_size=options['batch_size'],
+        )
+        if options['output'] == '-':
+            output = nullcontext(self.stdout)
+        else:
+            output = open(options['output'], 'w', encoding='utf-8',
+                          newline='')
+        with output as file:
+            for line in WRITERS[options['format']](records):
+                file.write(line)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts.caching import bump_versions, post_scope
+from posts.models import Post
+from posts.thumbnails import generate_thumbnails, save_srcset
+
+
+class Command(BaseCommand):
+    help = ('Создаёт миниатюры и варианты srcset для постов с картинкой, '
+            'у которых их ещё нет (например, загруженных до появления '
+            'вариантов).')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').filter(
+            image_srcset='').values_list('pk', 'image').order_by('pk')
+        total = 0
+        for pk, image_name in posts.iterator():
+            try:
+                srcset = generate_thumbnails(image_name)
+            except Exception as exception:
+                self.stderr.write(f'Пост {pk}: {exception!r}')
+                continue
+            save_srcset(pk, image_name, srcset)
+            bump_versions(post_scope(pk))
+            total += 1
+        self.stdout.write(f'Обработано постов: {total}')
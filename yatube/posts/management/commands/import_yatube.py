@@ -0,0 +1,318 @@
+import csv
+import json
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import search, timeline
+from posts.caching import bump_versions
+from posts.models import Comment, Follow, Group, Post
+from posts.paginators import feed_count_key
+
+User = get_user_model()
+
+# Порядок записи пачек: комментарии ссылаются на посты.
+RECORD_TYPES = ('post', 'comment', 'follow')
+# Сколько id подставлять в один `IN (...)` при пересчётах.
+IDS_PER_QUERY = 500
+
+
+def read_records(file, file_format):
+    """Записи входа по одной: строки JSON Lines или словари из CSV."""
+    if file_format == 'csv':
+        for row in csv.DictReader(file):
+            yield {key: value for key, value in row.items() if value}
+        return
+    for line in file:
+        if line.strip():
+            yield line
+
+
+def chunks(values, size=IDS_PER_QUERY):
+    values = iter(values)
+    while True:
+        chunk = list(islice(values, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_date(value):
+    """Дата из архива; без даты — текущий момент."""
+    if not value:
+        return timezone.now()
+    date = parse_datetime(value)
+    if date is None:
+        raise ValueError(f'неверная дата: {value}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+@contextmanager
+def archive_dates(*fields):
+    """Даёт `bulk_create` записать даты из архива вместо `auto_now_add`."""
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+class Command(BaseCommand):
+    help = ('Потоково импортирует посты, комментарии и подписки из JSON '
+            'Lines или CSV. Каждая запись — объект с полем type: '
+            'post (id, author, group, text, pub_date), comment (post, '
+            'author, text, created) или follow (user, author). Посты '
+            'должны идти раньше своих комментариев. Пост с уже занятым id '
+            'пропускается вместе с комментариями. Поисковый индекс и '
+            'счётчики комментариев обновляются по пачкам; остальные '
+            'счётчики, ленты подписок и активность групп — один раз в '
+            'конце, даже если импорт прервался.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл для импорта; «-» — stdin.')
+        parser.add_argument('--format', choices=('jsonl', 'csv'),
+                            help='По умолчанию — по расширению файла.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Строк в одном INSERT.')
+        parser.add_argument('--chunk-size', type=int, default=10000,
+                            help='Записей в одной транзакции.')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.batches = {kind: [] for kind in RECORD_TYPES}
+        self.imported = dict.fromkeys(RECORD_TYPES, 0)
+        self.skipped = dict.fromkeys(('post', 'comment'), 0)
+        self.skipped_post_ids = set()
+        self.authors, self.group_ids, self.readers = set(), set(), set()
+        self.builders = {
+            'post': self.build_post,
+            'comment': self.build_comment,
+            'follow': self.build_follow,
+        }
+        self.started = time.monotonic()
+        number = 0
+        dates = archive_dates(Post._meta.get_field('pub_date'),
+                              Comment._meta.get_field('created'))
+        try:
+            with self.open_input(options) as file, dates:
+                try:
+                    records = read_records(file, self.input_format(options))
+                    for number, record in enumerate(records, 1):
+                        self.add(record, number)
+                        if number % options['chunk_size'] == 0:
+                            self.flush()
+                            self.report(number)
+                except (KeyError, TypeError, ValueError) as error:
+                    raise CommandError(f'Запись {number}: {error!r}')
+                self.flush()
+        finally:
+            # Уже записанные пачки должны попасть в счётчики и ленты,
+            # даже если импорт остановила ошибка.
+            self.finish()
+        self.report(number)
+        self.stdout.write(
+            'Импортировано постов: {post}, комментариев: {comment}, '
+            'подписок: {follow}'.format(**self.imported))
+        if self.skipped['post']:
+            self.stdout.write(
+                'Пропущено постов с занятым id: {post}, комментариев к '
+                'ним: {comment}'.format(**self.skipped))
+
+    def input_format(self, options):
+        if options['format']:
+            return options['format']
+        return 'csv' if options['path'].endswith('.csv') else 'jsonl'
+
+    def open_input(self, options):
+        if options['path'] == '-':
+            return nullcontext(sys.stdin)
+        return open(options['path'], encoding='utf-8', newline='')
+
+    def report(self, number):
+        elapsed = time.monotonic() - self.started
+        rate = number / elapsed if elapsed else 0
+        self.stdout.write(
+            f'Обработано записей: {number} ({rate:.0f} записей/с)')
+
+    def user_id(self, username):
+        """id пользователя по имени; незнакомый создаётся без пароля."""
+        if username not in self.users:
+            self.users[username] = User.objects.create_user(
+                username=username).pk
+        return self.users[username]
+
+    def group_id(self, slug):
+        if not slug:
+            return None
+        if slug not in self.groups:
+            self.groups[slug] = Group.objects.create(
+                title=slug, slug=slug, description='').pk
+        return self.groups[slug]
+
+    def add(self, record, number):
+        if isinstance(record, str):
+            record = json.loads(record)
+        builder = self.builders.get(record['type'])
+        if builder is None:
+            raise ValueError(f'неизвестный тип записи: {record["type"]}')
+        instance = builder(record)
+        instance.record_number = number
+        self.batches[record['type']].append(instance)
+
+    def build_post(self, record):
+        post = Post(
+            id=int(record['id']) if record.get('id') else None,
+            author_id=self.user_id(record['author']),
+            group_id=self.group_id(record.get('group')),
+            text=record['text'],
+            pub_date=parse_date(record.get('pub_date')),
+        )
+        self.authors.add(post.author_id)
+        if post.group_id is not None:
+            self.group_ids.add(post.group_id)
+        return post
+
+    def build_comment(self, record):
+        return Comment(
+            post_id=int(record['post']),
+            author_id=self.user_id(record['author']),
+            text=record['text'],
+            created=parse_date(record.get('created')),
+        )
+
+    def build_follow(self, record):
+        follow = Follow(user_id=self.user_id(record['user']),
+                        author_id=self.user_id(record['author']))
+        self.readers.add(follow.user_id)
+        return follow
+
+    def flush(self):
+        """Записывает накопленные пачки одной транзакцией."""
+        posts = self.assign_post_ids(self.fresh_posts(self.batches['post']))
+        comments = self.checked_comments(self.batches['comment'], posts)
+        with transaction.atomic():
+            Post.objects.bulk_create(posts, self.batch_size)
+            Comment.objects.bulk_create(comments, self.batch_size)
+            Follow.objects.bulk_create(
+                self.batches['follow'], self.batch_size,
+                ignore_conflicts=True)
+            for post_ids in chunks(post.pk for post in posts):
+                search.index_posts(post_ids)
+            for post_ids in chunks({comment.post_id for comment in comments}):
+                self.recount_comments(post_ids)
+        self.imported['post'] += len(posts)
+        self.imported['comment'] += len(comments)
+        self.imported['follow'] += len(self.batches['follow'])
+        for batch in self.batches.values():
+            batch.clear()
+
+    def fresh_posts(self, posts):
+        """Посты пачки без тех, чей id уже занят в базе или повторяется
+        в архиве: их комментарии иначе достались бы чужому посту.
+        """
+        ids = [post.pk for post in posts if post.pk is not None]
+        taken = set()
+        for chunk in chunks(ids):
+            taken.update(Post.objects.filter(
+                pk__in=chunk).values_list('pk', flat=True))
+        fresh = []
+        for post in posts:
+            if post.pk in taken:
+                self.skipped_post_ids.add(post.pk)
+                self.stderr.write(f'Запись {post.record_number}: id '
+                                  f'{post.pk} уже занят, пост пропущен')
+            else:
+                fresh.append(post)
+                if post.pk is not None:
+                    taken.add(post.pk)
+        self.skipped['post'] += len(posts) - len(fresh)
+        return fresh
+
+    def assign_post_ids(self, posts):
+        """Выдаёт id постам без него: `bulk_create` в SQLite не
+        возвращает id, а они нужны поисковому индексу.
+        """
+        last_id = max(
+            [post.pk for post in posts if post.pk is not None],
+            default=0)
+        last_id = max(last_id, Post.objects.aggregate(
+            last_id=Max('pk'))['last_id'] or 0)
+        for post in posts:
+            if post.pk is None:
+                last_id += 1
+                post.pk = last_id
+        return posts
+
+    def checked_comments(self, comments, posts):
+        """Комментарии к пропущенным постам отбрасываются; ссылка на
+        несуществующий пост останавливает импорт с номером записи.
+        """
+        kept = [comment for comment in comments
+                if comment.post_id not in self.skipped_post_ids]
+        self.skipped['comment'] += len(comments) - len(kept)
+        known = {post.pk for post in posts}
+        wanted = {comment.post_id for comment in kept} - known
+        for chunk in chunks(wanted):
+            known.update(Post.objects.filter(
+                pk__in=chunk).values_list('pk', flat=True))
+        for comment in kept:
+            if comment.post_id not in known:
+                raise CommandError(f'Запись {comment.record_number}: нет '
+                                   f'поста с id {comment.post_id}')
+        return kept
+
+    def finish(self):
+        """Один раз делает то, что при обычном `save()` делают сигналы."""
+        if self.imported['post']:
+            self.reset_sequences()
+        call_command('repair_user_stats', batch_size=self.batch_size,
+                     stdout=self.stdout)
+        if self.imported['post']:
+            call_command('recount_group_stats', batch_size=self.batch_size,
+                         stdout=self.stdout)
+        readers = set(self.readers)
+        for authors in chunks(self.authors):
+            readers.update(Follow.objects.filter(
+                author_id__in=authors).values_list('user_id', flat=True))
+        for user_ids in chunks(sorted(readers)):
+            timeline.rebuild(user_ids)
+        cache.delete_many([
+            feed_count_key('index'),
+            *(feed_count_key('author', pk) for pk in self.authors),
+            *(feed_count_key('group', pk) for pk in self.group_ids),
+            *(feed_count_key('follow', pk) for pk in readers),
+        ])
+        bump_versions('site')
+
+    def reset_sequences(self):
+        """Посты пришли со своими id: счётчик id должен их обогнать."""
+        sql_list = connection.ops.sequence_reset_sql(no_style(), [Post])
+        with connection.cursor() as cursor:
+            for sql in sql_list:
+                cursor.execute(sql)
+
+    def recount_comments(self, post_ids):
+        counts = Comment.objects.filter(post=OuterRef('pk')).order_by()
+        counts = counts.values('post').annotate(
+            total=Count('pk')).values('total')
+        Post.objects.filter(pk__in=post_ids).update(comments_count=Coalesce(
+            Subquery(counts, output_field=IntegerField()), 0))
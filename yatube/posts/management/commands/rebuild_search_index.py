@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.search import is_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = ('Заново строит полнотекстовый индекс постов (FTS5), например '
+            'после массовой загрузки в обход сигналов.')
+
+    def handle(self, *args, **options):
+        if not is_available():
+            raise CommandError('Полнотекстовый индекс есть только в SQLite.')
+        total = rebuild_index()
+        self.stdout.write(f'Проиндексировано постов: {total}')
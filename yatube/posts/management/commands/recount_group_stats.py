@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.caching import bump_versions
+from posts.models import Group, GroupStats
+from posts.stats import count_group_stats
+
+FIELDS = ('posts', 'last_post', 'recent_posts')
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает активность групп для каталога. Запускайте '
+            'периодически (например, раз в час из cron): число постов '
+            'за неделю само по себе не убывает.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        totals = count_group_stats()
+        existing = {
+            stats.group_id: stats for stats in GroupStats.objects.all()
+        }
+        empty = dict.fromkeys(FIELDS)
+        empty.update(posts=0, recent_posts=0)
+        created, changed = [], []
+        for group_id in Group.objects.values_list('pk', flat=True).iterator():
+            expected = totals.get(group_id, empty)
+            stats = existing.get(group_id)
+            if stats is None:
+                created.append(GroupStats(group_id=group_id, **expected))
+                continue
+            if any(getattr(stats, field) != expected[field]
+                   for field in FIELDS):
+                for field in FIELDS:
+                    setattr(stats, field, expected[field])
+                changed.append(stats)
+        with transaction.atomic():
+            GroupStats.objects.bulk_create(
+                created, batch_size=options['batch_size'])
+            GroupStats.objects.bulk_update(
+                changed, FIELDS, batch_size=options['batch_size'])
+        if created or changed:
+            bump_versions('index')
+        self.stdout.write(
+            f'Создано записей: {len(created)}, исправлено: {len(changed)}')
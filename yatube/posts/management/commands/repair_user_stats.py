@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import UserStats
+from posts.stats import STATS_SOURCES, count_stats
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики пользователей (посты, подписчики, '
+            'подписки, комментарии) и исправляет расхождения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        fields = tuple(STATS_SOURCES)
+        totals = count_stats()
+        existing = {
+            stats.user_id: stats
+            for stats in UserStats.objects.only('user_id', *fields)
+        }
+        created, changed = [], []
+        for user_id in User.objects.values_list('pk', flat=True).iterator():
+            expected = totals.get(user_id, {})
+            stats = existing.get(user_id)
+            if stats is None:
+                created.append(UserStats(user_id=user_id, **expected))
+                continue
+            if any(getattr(stats, field) != expected.get(field, 0)
+                   for field in fields):
+                for field in fields:
+                    setattr(stats, field, expected.get(field, 0))
+                changed.append(stats)
+        with transaction.atomic():
+            UserStats.objects.bulk_create(
+                created, batch_size=options['batch_size'])
+            UserStats.objects.bulk_update(
+                changed, fields, batch_size=options['batch_size'])
+        self.stdout.write(
+            f'Создано записей: {len(created)}, исправлено: {len(changed)}')
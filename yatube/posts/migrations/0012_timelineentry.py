@@ -0,0 +1,78 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:53
+
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Q
+
+TIMELINE_MAX_ENTRIES = 1000
+
+
+def trim_timeline(TimelineEntry, user_id):
+    entries = TimelineEntry.objects.filter(user_id=user_id)
+    boundary = list(entries.order_by('-pub_date', '-post_id').values_list(
+        'pub_date', 'post_id')[TIMELINE_MAX_ENTRIES:TIMELINE_MAX_ENTRIES + 1])
+    if boundary:
+        pub_date, post_id = boundary[0]
+        entries.filter(
+            Q(pub_date__lt=pub_date)
+            | Q(pub_date=pub_date, post_id__lte=post_id)
+        ).delete()
+
+
+def fill_timelines(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    follows = Follow.objects.order_by('user_id').values_list(
+        'user_id', 'author_id')
+    for user_id, user_follows in groupby(follows, key=itemgetter(0)):
+        for _, author_id in user_follows:
+            posts = Post.objects.filter(author_id=author_id).order_by(
+                '-pub_date', '-id')[:TIMELINE_MAX_ENTRIES]
+            TimelineEntry.objects.bulk_create(
+                (TimelineEntry(user_id=user_id, post_id=post.id,
+                               author_id=post.author_id,
+                               pub_date=post.pub_date)
+                 for post in posts),
+                ignore_conflicts=True,
+            )
+        # Как `timeline.trim`: ограничение на ленту, а не на подписку.
+        trim_timeline(TimelineEntry, user_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0011_auto_20221202_1055'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.Post', verbose_name='Пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL, verbose_name='Читатель')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи ленты',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', '-pub_date', '-post'], name='timeline_user_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_timeline_post'),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
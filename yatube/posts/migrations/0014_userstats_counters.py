@@ -0,0 +1,55 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:57
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_user_stats(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    UserStats = apps.get_model('posts', 'UserStats')
+    sources = {
+        'posts': (apps.get_model('posts', 'Post'), 'author_id'),
+        'followers': (apps.get_model('posts', 'Follow'), 'author_id'),
+        'following': (apps.get_model('posts', 'Follow'), 'user_id'),
+        'comments': (apps.get_model('posts', 'Comment'), 'author_id'),
+    }
+    totals = {}
+    for field, (model, column) in sources.items():
+        rows = model.objects.values_list(column).annotate(
+            total=Count('pk')).order_by()
+        for user_id, total in rows:
+            totals.setdefault(user_id, {})[field] = total
+    UserStats.objects.all().delete()
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=user_id, **totals.get(user_id, {}))
+         for user_id in User.objects.values_list('pk', flat=True)),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0013_userstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='comments',
+            field=models.PositiveIntegerField(default=0, verbose_name='Комментарии'),
+        ),
+        migrations.AddField(
+            model_name='userstats',
+            name='following',
+            field=models.PositiveIntegerField(default=0, verbose_name='Подписки'),
+        ),
+        migrations.AddField(
+            model_name='userstats',
+            name='posts',
+            field=models.PositiveIntegerField(default=0, verbose_name='Посты'),
+        ),
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]
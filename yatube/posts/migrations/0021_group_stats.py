@@ -0,0 +1,56 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:29
+
+from datetime import timedelta
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+
+def fill_group_stats(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    GroupStats = apps.get_model('posts', 'GroupStats')
+    since = timezone.now() - timedelta(days=7)
+    groups = Group.objects.annotate(
+        total=Count('posts'),
+        last=Max('posts__pub_date'),
+        recent=Count('posts', filter=Q(posts__pub_date__gte=since)),
+    ).values_list('pk', 'total', 'last', 'recent')
+    GroupStats.objects.bulk_create(
+        GroupStats(group_id=pk, posts=total, last_post=last,
+                   recent_posts=recent)
+        for pk, total, last, recent in groups
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_post_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Group', verbose_name='Группа')),
+                ('posts', models.PositiveIntegerField(default=0, verbose_name='Посты')),
+                ('last_post', models.DateTimeField(blank=True, null=True, verbose_name='Последний пост')),
+                ('recent_posts', models.PositiveIntegerField(default=0, help_text='Пересчитывается командой recount_group_stats', verbose_name='Посты за неделю')),
+            ],
+            options={
+                'verbose_name': 'Статистика группы',
+                'verbose_name_plural': 'Статистика групп',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='groupstats',
+            index=models.Index(fields=['-recent_posts', '-last_post'], name='group_stats_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='groupstats',
+            index=models.Index(fields=['-last_post'], name='group_stats_last_post_idx'),
+        ),
+        migrations.RunPython(fill_group_stats, migrations.RunPython.noop),
+    ]
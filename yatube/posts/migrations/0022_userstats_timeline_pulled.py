@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_group_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='timeline_pulled',
+            field=models.BooleanField(default=False, help_text='Снимается командой backfill_timelines', verbose_name='Подмешивается в ленты при чтении'),
+        ),
+    ]
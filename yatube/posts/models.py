@@ -2,6 +2,7 @@ from django.contrib.auth import get_user_model
 from django.db import models
 
 from . import constants
+from .storage import ContentAddressedStorage
 
 User = get_user_model()
 
@@ -32,13 +33,35 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    image_srcset = models.TextField(
+        'Варианты картинки',
+        blank=True,
+        editable=False,
+        help_text='Значение srcset с готовыми уменьшенными копиями'
+    )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'), name='post_date_idx'),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_date_idx'),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_date_idx'),
+        )
 
     def __str__(self):
         """Строковое представление объекта."""
@@ -93,6 +116,11 @@ class Comment(models.Model):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ('-created',)
+        indexes = (
+            models.Index(
+                fields=('post', '-created', '-id'),
+                name='comment_post_created_idx'),
+        )
 
     def __str__(self):
         """Строковое представление объекта."""
@@ -117,7 +145,129 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписчик'
         verbose_name_plural = 'Подписчикии'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_follow'),
+        )
 
     def __str__(self):
         """Строковое представление объекта."""
         return self.text[:constants.SYMBOLS_IN_SELF_TEXT]
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_timeline_post'),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-post'),
+                name='timeline_user_date_idx'),
+        )
+
+
+class UserStats(models.Model):
+    """Денормализованные счётчики пользователя."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts = models.PositiveIntegerField('Посты', default=0)
+    followers = models.PositiveIntegerField('Подписчики', default=0)
+    following = models.PositiveIntegerField('Подписки', default=0)
+    comments = models.PositiveIntegerField('Комментарии', default=0)
+    timeline_pulled = models.BooleanField(
+        'Подмешивается в ленты при чтении',
+        default=False,
+        help_text='Снимается командой backfill_timelines',
+    )
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self):
+        """Строковое представление объекта."""
+        return str(self.user)
+
+
+class GroupStats(models.Model):
+    """Денормализованная активность группы для каталога групп."""
+
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Группа'
+    )
+    posts = models.PositiveIntegerField('Посты', default=0)
+    last_post = models.DateTimeField('Последний пост', blank=True, null=True)
+    recent_posts = models.PositiveIntegerField(
+        'Посты за неделю',
+        default=0,
+        help_text='Пересчитывается командой recount_group_stats'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика группы'
+        verbose_name_plural = 'Статистика групп'
+        indexes = (
+            models.Index(
+                fields=('-recent_posts', '-last_post'),
+                name='group_stats_recent_idx'),
+            models.Index(
+                fields=('-last_post',), name='group_stats_last_post_idx'),
+        )
+
+    def __str__(self):
+        """Строковое представление объекта."""
+        return str(self.group)
+
+
+class StoredImage(models.Model):
+    """Файл картинки в хранилище и число постов, которые на него
+    ссылаются.
+    """
+
+    name = models.CharField('Файл', max_length=255, primary_key=True)
+    refs = models.PositiveIntegerField('Ссылки', default=0)
+    updated = models.DateTimeField('Изменено', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+
+    def __str__(self):
+        """Строковое представление объекта."""
+        return self.name
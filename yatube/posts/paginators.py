@@ -0,0 +1,254 @@
+import json
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.encoding import force_bytes, force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from . import constants
+
+
+def feed_count_key(feed, pk=None):
+    """Ключ кэша с количеством постов в ленте."""
+    if pk is None:
+        return f'feed_count:{feed}'
+    return f'feed_count:{feed}:{pk}'
+
+
+def estimate_count(queryset):
+    """Оценка числа строк всей таблицы без COUNT(*).
+
+    Берётся из статистики планировщика: `pg_class.reltuples` для
+    PostgreSQL и `sqlite_stat1` (после ANALYZE) для SQLite. Для
+    отфильтрованных выборок и других СУБД возвращает None.
+    """
+    if queryset.query.where:
+        return None
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE relname = %s'
+    elif connection.vendor == 'sqlite':
+        sql = ('SELECT CAST(stat AS INTEGER) FROM sqlite_stat1 '
+               'WHERE tbl = %s LIMIT 1')
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except Exception:
+        return None
+    return row[0] if row else None
+
+
+class KeysetPaginator(Paginator):
+    """Пагинация по ключу сортировки вместо OFFSET.
+
+    Страница после курсора выбирается условием по ключам
+    (по умолчанию `(pub_date, id)`), поэтому глубокие страницы стоят
+    столько же, сколько первая. Номера страниц (`?page=N`) по-прежнему
+    поддерживаются методами базового `Paginator`.
+    """
+
+    def __init__(self, object_list, per_page,
+                 keys=('-pub_date', '-id'), **kwargs):
+        self.keys = tuple(key.lstrip('-') for key in keys)
+        self.descending = keys[0].startswith('-')
+        super().__init__(object_list.order_by(*keys), per_page, **kwargs)
+
+    def _get_page(self, object_list, number, paginator,
+                  has_next=None, has_previous=None):
+        """Создаёт обычную `Page` и добавляет к ней курсоры соседей.
+
+        Для страниц по курсору число страниц неизвестно, поэтому
+        `has_next`/`has_previous` подменяются уже вычисленными ответами.
+        """
+        page = Page(object_list, number, paginator)
+        if has_next is not None:
+            page.has_next = lambda: has_next
+            page.has_previous = lambda: has_previous
+        page.next_cursor = (
+            self.encode_cursor(page[-1], number)
+            if page.has_next() and len(page) else None
+        )
+        page.previous_cursor = (
+            self.encode_cursor(page[0], number)
+            if page.has_previous() and len(page) else None
+        )
+        return page
+
+    def encode_cursor(self, obj, number=None):
+        """Превращает ключи объекта в непрозрачный токен для URL.
+
+        Номер страницы, если он известен, едет в токене вместе с ключами,
+        чтобы соседние страницы тоже знали свой номер. Объектом может
+        быть и строка `values()`.
+        """
+        if isinstance(obj, dict):
+            obj = SimpleNamespace(**{
+                self._get_field(key).attname: obj[key] for key in self.keys
+            })
+        values = [
+            self._get_field(key).value_to_string(obj) for key in self.keys
+        ]
+        payload = {'k': values, 'n': number}
+        return urlsafe_base64_encode(force_bytes(json.dumps(payload)))
+
+    def decode_cursor(self, cursor):
+        """Возвращает ключи и номер страницы или None для битого токена."""
+        try:
+            payload = json.loads(force_str(urlsafe_base64_decode(cursor)))
+            values, number = payload['k'], payload['n']
+            if len(values) != len(self.keys):
+                return None
+            if number is not None:
+                number = int(number)
+            return [
+                self._get_field(key).to_python(value)
+                for key, value in zip(self.keys, values)
+            ], number
+        except Exception:
+            return None
+
+    def get_cursor_page(self, after=None, before=None):
+        """Страница после курсора `after` или перед курсором `before`.
+
+        Без курсора (или с некорректным курсором) возвращает первую
+        страницу.
+        """
+        if after:
+            decoded = self.decode_cursor(after)
+            if decoded is not None:
+                return self._page_after(*decoded)
+        if before:
+            decoded = self.decode_cursor(before)
+            if decoded is not None:
+                return self._page_before(*decoded)
+        objects = self._fetch(None, True, self.per_page + 1)
+        return self._get_page(
+            objects[:self.per_page], 1, self,
+            has_next=len(objects) > self.per_page,
+            has_previous=False,
+        )
+
+    def _page_after(self, values, number):
+        objects = self._fetch(values, True, self.per_page + 1)
+        return self._get_page(
+            objects[:self.per_page], number and number + 1, self,
+            has_next=len(objects) > self.per_page,
+            has_previous=True,
+        )
+
+    def _page_before(self, values, number):
+        objects = self._fetch(values, False, self.per_page + 1)
+        has_previous = len(objects) > self.per_page
+        objects = objects[:self.per_page][::-1]
+        if not has_previous:
+            number = 1
+        elif number:
+            number -= 1
+        return self._get_page(
+            objects, number, self,
+            has_next=True,
+            has_previous=has_previous,
+        )
+
+    def _fetch(self, values, forward, limit):
+        """Не больше `limit` объектов после курсора (или до него).
+
+        Объекты возвращаются в порядке обхода: при `forward=False`
+        ближайший к курсору идёт первым.
+        """
+        return list(self.seek(self.object_list, values, forward)[:limit])
+
+    def seek(self, queryset, values, forward, keys=None):
+        """Выборка, отсортированная от курсора в нужную сторону.
+
+        `keys` позволяет листать другую модель с теми же значениями
+        ключей под другими именами.
+        """
+        keys = keys or self.keys
+        if values is not None:
+            lookup = 'lt' if forward == self.descending else 'gt'
+            condition = Q()
+            for index, key in enumerate(keys):
+                step = Q(**dict(zip(keys[:index], values[:index])))
+                step &= Q(**{f'{key}__{lookup}': values[index]})
+                condition |= step
+            queryset = queryset.filter(condition)
+        prefix = '-' if forward == self.descending else ''
+        return queryset.order_by(*(prefix + key for key in keys))
+
+    def _get_field(self, name):
+        return self.object_list.model._meta.get_field(name)
+
+
+class CachedCountPaginator(KeysetPaginator):
+    """Пагинатор, который берёт количество постов из кэша.
+
+    Значение под `count_key` поддерживают сигналы `Post` (см.
+    `posts.signals`). При промахе для огромных таблиц используется
+    оценка из статистики СУБД вместо точного COUNT(*).
+    """
+
+    def __init__(self, object_list, per_page, count_key=None, **kwargs):
+        self.count_key = count_key
+        super().__init__(object_list, per_page, **kwargs)
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return self.object_list.count()
+        count = cache.get(self.count_key)
+        if count is None:
+            count = estimate_count(self.object_list)
+            if count is None or count < constants.EXACT_COUNT_LIMIT:
+                count = self.object_list.count()
+            cache.set(self.count_key, count,
+                      constants.FEED_COUNT_CACHE_TIMEOUT)
+        return count
+
+    def _get_page(self, *args, **kwargs):
+        page = super()._get_page(*args, **kwargs)
+        page.page_window = self.page_window(page.number)
+        return page
+
+    def page_window(self, number, on_each_side=constants.PAGES_ON_EACH_SIDE):
+        """Номера первой, последней и соседних страниц.
+
+        Пропуски между ними обозначены None; для страницы с неизвестным
+        номером остаются только первая и последняя.
+        """
+        last = self.num_pages
+        if number is None:
+            pages = {1, last}
+        else:
+            pages = {1, last, *range(number - on_each_side,
+                                     number + on_each_side + 1)}
+        window = []
+        for page in sorted(p for p in pages if 1 <= p <= last):
+            if window and page - window[-1] > 1:
+                window.append(None)
+            window.append(page)
+        return window
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор для админки без точного COUNT(*) по огромной таблице.
+
+    Для всей таблицы берётся оценка из статистики СУБД, для
+    отфильтрованной выборки строки считаются не дальше
+    `EXACT_COUNT_LIMIT`.
+    """
+
+    @cached_property
+    def count(self):
+        count = estimate_count(self.object_list)
+        if count is not None and count >= constants.EXACT_COUNT_LIMIT:
+            return count
+        return self.object_list[:constants.EXACT_COUNT_LIMIT].count()
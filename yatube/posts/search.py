@@ -0,0 +1,163 @@
+import json
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.encoding import force_bytes, force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from . import constants
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+WORD_RE = re.compile(r'\w+')
+
+
+def is_available():
+    """FTS5 есть только в SQLite; на других СУБД ищем через LIKE."""
+    return connection.vendor == 'sqlite'
+
+
+def index_post(post_id, text):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                       [post_id])
+        cursor.execute(f'INSERT INTO {FTS_TABLE}(rowid, text) '
+                       f'VALUES (%s, %s)', [post_id, text])
+
+
+def unindex_post(post_id):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                       [post_id])
+
+
+def index_posts(post_ids):
+    """Индексирует пачку постов по id одним `INSERT ... SELECT`."""
+    if not is_available():
+        return
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} '
+                       f'WHERE rowid IN ({placeholders})', post_ids)
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, text) '
+            f'SELECT id, text FROM {Post._meta.db_table} '
+            f'WHERE id IN ({placeholders})', post_ids)
+
+
+def rebuild_index():
+    """Заново заполняет индекс из таблицы постов."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, text) '
+            f'SELECT id, text FROM {Post._meta.db_table}')
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) "
+                       f"VALUES ('optimize')")
+        cursor.execute(f'SELECT count(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def match_query(query):
+    """Запрос пользователя как выражение FTS5: все слова, последнее —
+    по префиксу. Операторы FTS5 из ввода не проходят.
+    """
+    words = WORD_RE.findall(query.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def filter_matching(queryset, query):
+    """Оставляет в выборке постов подходящие под запрос.
+
+    Совпадения берутся подзапросом к индексу, без LIKE по всей таблице.
+    """
+    if not is_available():
+        return queryset.filter(text__icontains=query)
+    match = match_query(query)
+    if match is None:
+        return queryset.none()
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [match]))
+
+
+def encode_cursor(rank, post_id):
+    return urlsafe_base64_encode(force_bytes(json.dumps([rank, post_id])))
+
+
+def decode_cursor(cursor):
+    try:
+        rank, post_id = json.loads(force_str(urlsafe_base64_decode(cursor)))
+        return float(rank), int(post_id)
+    except Exception:
+        return None
+
+
+def _ranked_ids(match, after, limit):
+    """Лучшие по bm25 из `SEARCH_CANDIDATES` самых свежих совпадений.
+
+    FTS5 отдаёт совпадения в порядке rowid без сортировки, а `rank`
+    считается только для строк, прошедших LIMIT. Без предела частое
+    слово заставило бы считать и сортировать bm25 всех совпадений
+    на каждой странице; цена предела — старые посты за его границей
+    не находятся.
+    """
+    sql = (f'SELECT rowid, rank FROM ('
+           f'SELECT rowid, rank FROM {FTS_TABLE} '
+           f'WHERE {FTS_TABLE} MATCH %s ORDER BY rowid DESC LIMIT %s)')
+    params = [match, constants.SEARCH_CANDIDATES]
+    if after is not None:
+        rank, post_id = after
+        sql += ' WHERE rank > %s OR (rank = %s AND rowid > %s)'
+        params += [rank, rank, post_id]
+    sql += ' ORDER BY rank, rowid LIMIT %s'
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _like_ids(query, after, limit):
+    posts = Post.objects.filter(text__icontains=query).order_by('-id')
+    if after is not None:
+        posts = posts.filter(id__lt=after[1])
+    return [(pk, 0.0) for pk in posts.values_list('pk', flat=True)[:limit]]
+
+
+class SearchPage(list):
+    """Посты страницы результатов и курсор следующей страницы."""
+
+    next_cursor = None
+
+
+def search_posts(query, after=None, per_page=constants.POSTS_PER_PAGE):
+    """Страница найденных постов, лучшие совпадения первыми.
+
+    Ранжирует bm25 из FTS5 среди `SEARCH_CANDIDATES` самых свежих
+    совпадений; страницы листаются курсором `(rank, id)`, так что
+    глубина страницы не влияет на её цену.
+    """
+    page = SearchPage()
+    after = decode_cursor(after) if after else None
+    if is_available():
+        match = match_query(query)
+        if match is None:
+            return page
+        rows = _ranked_ids(match, after, per_page + 1)
+    else:
+        rows = _like_ids(query, after, per_page + 1)
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        [pk for pk, _ in rows[:per_page]])
+    page.extend(posts[pk] for pk, _ in rows[:per_page] if pk in posts)
+    if len(rows) > per_page:
+        page.next_cursor = encode_cursor(*reversed(rows[per_page - 1]))
+    return page
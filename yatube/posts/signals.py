@@ -0,0 +1,287 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import search, timeline
+from .caching import author_scope, bump_versions, group_scope, post_scope
+from .images import shift_image_refs
+from .models import Comment, Follow, Group, GroupStats, Post, UserStats
+from .paginators import feed_count_key
+from .stats import shift_group_stats, shift_stats
+
+User = get_user_model()
+
+# Поля поста, смену которых замечают сигналы ниже.
+TRACKED_POST_FIELDS = ('group_id', 'image', 'text')
+
+
+def shift_counts(keys, delta):
+    """Сдвигает закэшированные счётчики; отсутствующие ключи пропускает."""
+    for key in keys:
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            pass
+
+
+def post_feed_keys(post, group_id):
+    """Ключи счётчиков всех лент, в которых показывается пост."""
+    keys = [
+        feed_count_key('index'),
+        feed_count_key('author', post.author_id),
+    ]
+    if group_id is not None:
+        keys.append(feed_count_key('group', group_id))
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    keys.extend(feed_count_key('follow', user_id) for user_id in followers)
+    return keys
+
+
+def image_name(value):
+    return getattr(value, 'name', value) or ''
+
+
+def tracked_value(field, value):
+    return image_name(value) if field == 'image' else value
+
+
+@receiver(post_init, sender=Post)
+def remember_post_fields(sender, instance, **kwargs):
+    """Запоминает исходные группу, картинку и текст, чтобы сигналы ниже
+    заметили их смену.
+
+    Отложенные поля (`.only()`, `.defer()`) не читаются: иначе каждое
+    стоило бы запроса, а пустой снимок выглядел бы как смена.
+    """
+    deferred = instance.get_deferred_fields()
+    instance._loaded = {
+        field: tracked_value(field, instance.__dict__[field])
+        for field in TRACKED_POST_FIELDS if field not in deferred
+    }
+
+
+@receiver(pre_save, sender=Post)
+def load_deferred_post_fields(sender, instance, **kwargs):
+    """Дочитывает исходные значения отложенных полей одним запросом.
+
+    Поле, которое так и не присвоили, получает то же значение, что дал
+    бы `refresh_from_db`, и не считается изменённым.
+    """
+    missing = [field for field in TRACKED_POST_FIELDS
+               if field not in instance._loaded]
+    if not missing or instance.pk is None:
+        return
+    row = Post.objects.filter(pk=instance.pk).values(*missing).first()
+    if row is None:
+        return
+    deferred = instance.get_deferred_fields()
+    for field, value in row.items():
+        instance._loaded[field] = tracked_value(field, value)
+        if field in deferred:
+            instance.__dict__[field] = value
+
+
+@receiver(post_save, sender=Post)
+def update_counts_on_post_save(sender, instance, created, **kwargs):
+    old_group_id = instance._loaded['group_id']
+    if created:
+        shift_counts(post_feed_keys(instance, instance.group_id), 1)
+    elif old_group_id != instance.group_id:
+        if old_group_id is not None:
+            shift_counts([feed_count_key('group', old_group_id)], -1)
+        if instance.group_id is not None:
+            shift_counts([feed_count_key('group', instance.group_id)], 1)
+
+
+@receiver(post_delete, sender=Post)
+def update_counts_on_post_delete(sender, instance, **kwargs):
+    shift_counts(post_feed_keys(instance, instance.group_id), -1)
+
+
+@receiver(post_save, sender=Post)
+def push_post_to_timelines(sender, instance, created, **kwargs):
+    if created:
+        timeline.push_post(instance)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Group)
+def create_group_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        GroupStats.objects.get_or_create(group=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_group_post(sender, instance, created, **kwargs):
+    old_group_id = None if created else instance._loaded['group_id']
+    if old_group_id != instance.group_id:
+        if old_group_id is not None:
+            shift_group_stats(old_group_id, instance.pub_date, -1)
+        if instance.group_id is not None:
+            shift_group_stats(instance.group_id, instance.pub_date, 1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_group_post(sender, instance, **kwargs):
+    if instance.group_id is not None:
+        shift_group_stats(instance.group_id, instance.pub_date, -1)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    if created:
+        shift_stats(instance.author_id, posts=1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    shift_stats(instance.author_id, posts=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        shift_stats(instance.author_id, comments=1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    shift_stats(instance.author_id, comments=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_post_comment(sender, instance, created, **kwargs):
+    if created and instance.post_id is not None:
+        Post.objects.filter(pk=instance.post_id).update(
+            comments_count=F('comments_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_post_comment(sender, instance, **kwargs):
+    if instance.post_id is not None:
+        Post.objects.filter(
+            pk=instance.post_id, comments_count__gt=0).update(
+                comments_count=F('comments_count') - 1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follower(sender, instance, created, **kwargs):
+    if created:
+        shift_stats(instance.author_id, followers=1)
+        shift_stats(instance.user_id, following=1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_lost_follower(sender, instance, **kwargs):
+    shift_stats(instance.author_id, followers=-1)
+    shift_stats(instance.user_id, following=-1)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    timeline.prune(instance.user_id, instance.author_id)
+    timeline.follower_lost(instance.author_id)
+
+
+@receiver((post_save, post_delete), sender=Follow)
+def reset_follow_count(sender, instance, **kwargs):
+    cache.delete(feed_count_key('follow', instance.user_id))
+
+
+def post_scopes(post, *group_ids):
+    """Области кэша страниц, на которых показывается пост."""
+    scopes = ['index', post_scope(post.pk)]
+    username = User.objects.filter(pk=post.author_id).values_list(
+        'username', flat=True).first()
+    if username is not None:
+        scopes.append(author_scope(username))
+    group_ids = {pk for pk in group_ids if pk is not None}
+    if group_ids:
+        slugs = Group.objects.filter(pk__in=group_ids).values_list(
+            'slug', flat=True)
+        scopes.extend(group_scope(slug) for slug in slugs)
+    return scopes
+
+
+@receiver((post_save, post_delete), sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    bump_versions(*post_scopes(
+        instance, instance._loaded.get('group_id'), instance.group_id))
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    post = Post.objects.filter(pk=instance.post_id).only(
+        'author_id', 'group_id').first()
+    if post is not None:
+        bump_versions(*post_scopes(post, post.group_id))
+
+
+@receiver((post_save, post_delete), sender=Follow)
+def invalidate_follow_pages(sender, instance, **kwargs):
+    username = User.objects.filter(pk=instance.author_id).values_list(
+        'username', flat=True).first()
+    if username is not None:
+        bump_versions(author_scope(username))
+
+
+@receiver((post_save, post_delete), sender=Group)
+def invalidate_group_pages(sender, instance, **kwargs):
+    bump_versions('site')
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_pages(sender, instance, created, update_fields=None,
+                          **kwargs):
+    """Имя автора видно на всех страницах; вход в систему не в счёт."""
+    if not created and update_fields != frozenset({'last_login'}):
+        bump_versions('site')
+
+
+@receiver(post_save, sender=Post)
+def count_image_refs(sender, instance, created, raw=False, **kwargs):
+    old = '' if created else instance._loaded['image']
+    new = image_name(instance.image)
+    if new != old and not raw:
+        shift_image_refs(new, 1)
+        shift_image_refs(old, -1)
+
+
+@receiver(post_delete, sender=Post)
+def release_image_ref(sender, instance, **kwargs):
+    shift_image_refs(image_name(instance.image), -1)
+
+
+@receiver(post_save, sender=Post)
+def index_post_text(sender, instance, created, **kwargs):
+    if created or instance.text != instance._loaded['text']:
+        search.index_post(instance.pk, instance.text)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post_text(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def forget_post_fields(sender, instance, **kwargs):
+    """Сохранённые значения становятся исходными для следующего
+    `save()`; подключён после всех сигналов, которые их сравнивают.
+    """
+    remember_post_fields(sender, instance)
@@ -0,0 +1,75 @@
+"""Всё, что берём из внутренностей sorl-thumbnail.
+
+Публичный API sorl не умеет посчитать имя миниатюры без её создания
+и прочитать много записей key-value store разом. Для этого нужны
+приватные методы бэкенда и устройство `cached_db` kvstore; они
+проверены для `SORL_VERSION`, тест сверяет её с установленной.
+"""
+import sorl
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as CachedDBStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+SORL_VERSION = '12.7.0'
+
+
+def installed_version():
+    return sorl.__version__
+
+
+def thumbnail_filename(name, geometry, options):
+    """Имя файла миниатюры, как его считает
+    `ThumbnailBackend.get_thumbnail`.
+    """
+    backend = default.backend
+    source = ImageFile(name)
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return backend._get_thumbnail_filename(source, geometry, options)
+
+
+def stored_thumbnails(names):
+    """Записи key-value store по именам миниатюр: `{имя: ImageFile}`.
+
+    У `cached_db` kvstore читает одним `get_many` к кэшу и одним
+    запросом к БД, у остальных — публичным `kvstore.get` по одной.
+    """
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDBStore):
+        found = {
+            name: kvstore.get(ImageFile(name, default.storage))
+            for name in names
+        }
+        return {name: image for name, image in found.items() if image}
+    keys = {
+        add_prefix(ImageFile(name, default.storage).key): name
+        for name in names
+    }
+    values = {
+        key: value
+        for key, value in kvstore.cache.get_many(list(keys)).items()
+        if value != EMPTY_VALUE
+    }
+    missing = [key for key in keys if key not in values]
+    if missing:
+        stored = dict(KVStoreModel.objects.filter(
+            key__in=missing).values_list('key', 'value'))
+        kvstore.cache.set_many(
+            stored, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(stored)
+    return {
+        keys[key]: deserialize_image_file(value)
+        for key, value in values.items()
+    }
@@ -0,0 +1,106 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import (Count, DateTimeField, F, Max, OuterRef, Q,
+                              Subquery, Value)
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from . import constants
+from .models import Comment, Follow, GroupStats, Post, UserStats
+
+User = get_user_model()
+
+STATS_SOURCES = {
+    'posts': (Post, 'author_id'),
+    'followers': (Follow, 'author_id'),
+    'following': (Follow, 'user_id'),
+    'comments': (Comment, 'author_id'),
+}
+
+
+def shift_stats(user_id, **deltas):
+    """Атомарно сдвигает счётчики пользователя.
+
+    Запись не создаётся: при каскадном удалении пользователя она уже
+    может быть удалена. Пропуски чинит `repair_user_stats`.
+    """
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    floors = {
+        f'{field}__gte': -delta
+        for field, delta in deltas.items() if delta < 0
+    }
+    UserStats.objects.filter(user_id=user_id, **floors).update(**changes)
+
+
+def count_stats(user_ids=None):
+    """Точные счётчики по таблицам: `{user_id: {поле: значение}}`."""
+    totals = {}
+    for field, (model, column) in STATS_SOURCES.items():
+        rows = model.objects.all()
+        if user_ids is not None:
+            rows = rows.filter(**{f'{column}__in': user_ids})
+        rows = rows.values_list(column).annotate(total=Count('pk'))
+        for user_id, total in rows.order_by():
+            totals.setdefault(user_id, {})[field] = total
+    return totals
+
+
+def recount_stats(user):
+    """Пересчитывает и сохраняет счётчики одного пользователя."""
+    totals = count_stats([user.pk]).get(user.pk, {})
+    stats, _ = UserStats.objects.update_or_create(
+        user=user,
+        defaults={field: totals.get(field, 0) for field in STATS_SOURCES},
+    )
+    return stats
+
+
+def get_user_stats(user):
+    """Счётчики пользователя; недостающая запись создаётся по факту."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return recount_stats(user)
+
+
+def recent_since():
+    """Начало окна, за которое считаются свежие посты группы."""
+    return timezone.now() - timedelta(days=constants.GROUP_RECENT_DAYS)
+
+
+def shift_group_stats(group_id, pub_date, delta):
+    """Учитывает пост, добавленный в группу (`delta=1`) или убранный
+    из неё (`delta=-1`).
+
+    Счётчики не уходят ниже нуля: свежие посты могли уже выпасть из
+    окна при пересчёте. Время последнего поста при убирании берётся
+    заново по индексу `(group, -pub_date)`.
+    """
+    changes = {'posts': Greatest(F('posts') + delta, 0)}
+    if pub_date >= recent_since():
+        changes['recent_posts'] = Greatest(F('recent_posts') + delta, 0)
+    if delta > 0:
+        pub_date = Value(pub_date, output_field=DateTimeField())
+        changes['last_post'] = Greatest(
+            Coalesce('last_post', pub_date), pub_date)
+    else:
+        changes['last_post'] = Subquery(Post.objects.filter(
+            group_id=OuterRef('group_id')).order_by(
+                '-pub_date').values('pub_date')[:1])
+    GroupStats.objects.filter(group_id=group_id).update(**changes)
+
+
+def count_group_stats():
+    """Точная активность групп: `{group_id: {поле: значение}}`."""
+    rows = Post.objects.filter(group__isnull=False).values_list(
+        'group_id').annotate(
+            posts=Count('pk'),
+            last_post=Max('pub_date'),
+            recent_posts=Count('pk', filter=Q(pub_date__gte=recent_since())),
+    ).order_by()
+    return {
+        group_id: {'posts': posts, 'last_post': last_post,
+                   'recent_posts': recent_posts}
+        for group_id, posts, last_post, recent_posts in rows
+    }
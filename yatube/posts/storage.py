@@ -0,0 +1,53 @@
+import hashlib
+import os
+import posixpath
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CONTENT_NAME_RE = re.compile(r'[0-9a-f]{64}(\.\w+)?')
+
+
+def content_hash(content):
+    """SHA-256 содержимого файла, прочитанного блоками."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def is_content_addressed(name):
+    """Имя файла дал `ContentAddressedStorage`: хэш и расширение."""
+    return CONTENT_NAME_RE.fullmatch(posixpath.basename(name)) is not None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, в котором имя файла — хэш его содержимого.
+
+    Повторная загрузка того же файла ничего не пишет и возвращает
+    имя существующего, а значит, и его готовые миниатюры. Сколько
+    постов ссылается на файл, хранит `StoredImage`; удаляет
+    неиспользуемые файлы команда `collect_images`.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        extension = posixpath.splitext(name)[1].lower()
+        name = posixpath.join(
+            posixpath.dirname(name), content_hash(content) + extension)
+        if self.exists(name):
+            # Свежая дата изменения не даёт `collect_images` удалить
+            # файл, пока пост с ним ещё не сохранён.
+            try:
+                os.utime(self.path(name))
+                return name
+            except FileNotFoundError:
+                pass
+        return super().save(name, content, max_length)
@@ -0,0 +1,15 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from ..caching import render_post_cards
+from ..thumbnails import preload_thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """Готовые карточки постов страницы из общего кэша."""
+    return [mark_safe(card) for card in
+            render_post_cards(posts, context.get('group'),
+                              prepare=preload_thumbnails)]
@@ -0,0 +1,11 @@
+from django import template
+
+from ..thumbnails import ready_thumbnail as get_ready_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def ready_thumbnail(file_, geometry, **options):
+    """Готовая миниатюра или None, пока воркер её не создал."""
+    return get_ready_thumbnail(file_, geometry, **options)
@@ -0,0 +1,79 @@
+from datetime import datetime
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.testing import QueryBudgetTestMixin
+
+from .. import constants
+from ..models import Group, Post
+from ..paginators import EstimatedCountPaginator
+
+User = get_user_model()
+
+
+class PostAdminTests(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        cls.groups = [
+            Group.objects.create(title=f'Группа {i}', slug=f'group-{i}',
+                                 description='описание')
+            for i in range(3)
+        ]
+        cls.url = reverse('admin:posts_post_changelist')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def create_posts(self, count, **kwargs):
+        for i in range(count):
+            author = User.objects.create_user(username=f'user-{i}-{count}')
+            Post.objects.create(author=author, text=f'текст {i}',
+                                group=self.groups[i % 3], **kwargs)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Число запросов списка постов не зависит от числа строк."""
+        self.create_posts(2)
+        before = self.count_queries(self.client, self.url)
+        self.create_posts(6)
+        self.assertEqual(self.count_queries(self.client, self.url), before)
+
+    def test_group_is_edited_with_autocomplete(self):
+        """Группа в списке выбирается автодополнением, а не списком всех."""
+        self.create_posts(1)
+        response = self.client.get(self.url)
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertNotContains(response, self.groups[1].title)
+
+    def test_search_uses_full_text_index(self):
+        """Поиск в админке идёт по полнотекстовому индексу."""
+        self.create_posts(1)
+        post = Post.objects.create(author=self.admin, text='уникальное')
+        response = self.client.get(self.url, {'q': 'уникальн'})
+        self.assertEqual(list(response.context['cl'].result_list), [post])
+
+    def test_date_hierarchy_lists_non_empty_periods(self):
+        """Навигация по датам показывает только периоды с постами."""
+        for year in (2019, 2021):
+            post = Post.objects.create(author=self.admin, text=str(year))
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=timezone.make_aware(datetime(year, 5, 1)))
+        response = self.client.get(self.url)
+        self.assertContains(response, 'pub_date__year=2019')
+        self.assertContains(response, 'pub_date__year=2021')
+        self.assertNotContains(response, 'pub_date__year=2020')
+
+    def test_estimated_count_for_huge_table(self):
+        """Для огромной таблицы берётся оценка вместо COUNT(*)."""
+        estimate = constants.EXACT_COUNT_LIMIT * 10
+        with mock.patch('posts.paginators.estimate_count',
+                        return_value=estimate):
+            paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+            with self.assertNumQueries(0):
+                self.assertEqual(paginator.count, estimate)
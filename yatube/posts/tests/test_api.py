@@ -0,0 +1,91 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import constants
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='описание')
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'пост {i}',
+                                group=cls.group)
+            for i in range(constants.POSTS_PER_PAGE + 3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_feeds_are_paginated_with_cursor(self):
+        """Ленты листаются курсором и отдают все посты без повторов."""
+        urls = (
+            reverse('posts:api_index'),
+            reverse('posts:api_group_list', args=(self.group.slug,)),
+            reverse('posts:api_profile', args=(self.author.username,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.client.get(url).json()
+                self.assertEqual(len(first['results']),
+                                 constants.POSTS_PER_PAGE)
+                self.assertIsNone(first['previous'])
+                second = self.client.get(first['next']).json()
+                self.assertIsNone(second['next'])
+                ids = [post['id'] for post in
+                       first['results'] + second['results']]
+                self.assertEqual(
+                    ids, [post.pk for post in reversed(self.posts)])
+                back = self.client.get(second['previous']).json()
+                self.assertEqual(back['results'], first['results'])
+
+    def test_sparse_fieldsets(self):
+        """`fields=` оставляет в ответе и в запросе только нужные поля."""
+        url = reverse('posts:api_index')
+        with self.assertNumQueries(1) as queries:
+            data = self.client.get(url, {'fields': 'text,author'}).json()
+        self.assertEqual(data['results'][0],
+                         {'text': self.posts[-1].text, 'author': 'auth'})
+        sql = queries.captured_queries[0]['sql']
+        self.assertNotIn('"image"', sql)
+        self.assertNotIn('posts_group', sql)
+
+    def test_unknown_field_is_rejected(self):
+        """Неизвестное поле — ошибка 400 с перечнем доступных."""
+        response = self.client.get(reverse('posts:api_index'),
+                                   {'fields': 'text,password'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_post_detail(self):
+        """Пост отдаётся по id, несуществующий — 404."""
+        post = self.posts[0]
+        data = self.client.get(
+            reverse('posts:api_post_detail', args=(post.pk,))).json()
+        self.assertEqual(data['id'], post.pk)
+        self.assertEqual(data['group'], self.group.slug)
+        self.assertIsNone(data['image'])
+        response = self.client.get(
+            reverse('posts:api_post_detail', args=(0,)))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_cache_is_invalidated_with_html_pages(self):
+        """Кэш ответа сбрасывается той же записью, что и кэш страниц."""
+        url = reverse('posts:api_group_list', args=(self.group.slug,))
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        post = Post.objects.create(author=self.author, text='свежий',
+                                   group=self.group)
+        data = self.client.get(url).json()
+        self.assertEqual(data['results'][0]['id'], post.pk)
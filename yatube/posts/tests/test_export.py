@@ -0,0 +1,94 @@
+import csv
+import json
+from http import HTTPStatus
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..export import export_records
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+        cls.staff = User.objects.create_user(username='staff',
+                                             is_staff=True)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='описание')
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'пост {i}',
+                                group=cls.group)
+            for i in range(5)
+        ]
+        # Одинаковая дата: порядок внутри неё задаёт id.
+        Post.objects.filter(pk__in=[post.pk for post in cls.posts]).update(
+            pub_date=cls.posts[0].pub_date)
+        Comment.objects.create(post=cls.posts[1], author=cls.other,
+                               text='комментарий')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_keyset_batches_cover_all_posts(self):
+        """Пачки по ключу отдают все посты по порядку без повторов."""
+        records = list(export_records(
+            self.author.posts.all(), comments=True, batch_size=2))
+        posts = [record['id'] for record in records
+                 if record['type'] == 'post']
+        self.assertEqual(posts, [post.pk for post in self.posts])
+        comment = next(r for r in records if r['type'] == 'comment')
+        self.assertEqual(comment['post'], self.posts[1].pk)
+        self.assertEqual(comment['author'], 'other')
+        self.assertNotIn('image', records[0])
+
+    def test_author_export_streams_jsonl(self):
+        """Автор получает свою выгрузку потоком в JSONL."""
+        response = self.client.get(
+            reverse('posts:profile_export', args=(self.author.username,)),
+            {'comments': '1', 'images': '1'})
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(len(records), len(self.posts) + 1)
+        self.assertEqual(records[0]['author'], 'auth')
+        self.assertIsNone(records[0]['image'])
+
+    def test_group_export_as_csv(self):
+        """Персонал выгружает группу в CSV."""
+        self.client.force_login(self.staff)
+        response = self.client.get(
+            reverse('posts:group_export', args=(self.group.slug,)),
+            {'format': 'csv'})
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual([row['id'] for row in rows],
+                         [str(post.pk) for post in self.posts])
+        self.assertEqual(rows[0]['group'], 'group')
+
+    def test_export_is_forbidden_for_others(self):
+        """Чужие посты и группы выгрузить нельзя."""
+        self.client.force_login(self.other)
+        urls = (
+            reverse('posts:profile_export', args=(self.author.username,)),
+            reverse('posts:group_export', args=(self.group.slug,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code,
+                                 HTTPStatus.FORBIDDEN)
+
+    def test_export_command(self):
+        """Команда пишет выгрузку в stdout."""
+        out = StringIO()
+        call_command('export_posts', group=self.group.slug, stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), len(self.posts))
@@ -0,0 +1,100 @@
+import time
+from http import HTTPStatus
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='описание')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост для ленты', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_feeds_list_posts(self):
+        """RSS и Atom для сайта, группы и автора содержат пост."""
+        for kind in ('rss', 'atom'):
+            urls = (
+                reverse('posts:index_feed', args=(kind,)),
+                reverse('posts:group_feed', args=(self.group.slug, kind)),
+                reverse('posts:profile_feed',
+                        args=(self.author.username, kind)),
+            )
+            for url in urls:
+                with self.subTest(url=url):
+                    response = self.client.get(url)
+                    self.assertContains(response, self.post.text)
+                    self.assertIn(kind, response['Content-Type'])
+
+    def test_unknown_feed_kind(self):
+        """Неизвестный формат ленты — 404."""
+        response = self.client.get(reverse('posts:index_feed', args=('x',)))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_polling_gets_not_modified(self):
+        """Повторный опрос без изменений получает 304 без запросов к БД."""
+        url = reverse('posts:group_feed', args=(self.group.slug, 'rss'))
+        response = self.client.get(url)
+        conditions = (
+            {'HTTP_IF_NONE_MATCH': response['ETag']},
+            {'HTTP_IF_MODIFIED_SINCE': response['Last-Modified']},
+        )
+        for headers in conditions:
+            with self.subTest(headers=headers), self.assertNumQueries(0):
+                response = self.client.get(url, **headers)
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+
+    def test_new_post_invalidates_feed(self):
+        """Новый пост группы сбрасывает закэшированную ленту."""
+        url = reverse('posts:group_feed', args=(self.group.slug, 'atom'))
+        etag = self.client.get(url)['ETag']
+        Post.objects.create(author=self.author, text='Свежий пост',
+                            group=self.group)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'Свежий пост')
+
+    def test_edit_and_delete_change_last_modified(self):
+        """Правка и удаление поста не отвечают 304 по If-Modified-Since."""
+        url = reverse('posts:group_feed', args=(self.group.slug, 'rss'))
+        post = Post.objects.get(pk=self.post.pk)
+
+        def edit():
+            post.text = 'Исправленный пост'
+            post.save()
+
+        for delay, change in enumerate((edit, post.delete), start=1):
+            with self.subTest(change=change.__name__):
+                last_modified = self.client.get(url)['Last-Modified']
+                with mock.patch('posts.caching.time.time',
+                                return_value=time.time() + 5 * delay):
+                    change()
+                response = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_empty_feed_keeps_last_modified(self):
+        """Пустая лента не сообщает о новом изменении на каждом запросе."""
+        Post.objects.all().delete()
+        url = reverse('posts:index_feed', args=('atom',))
+        last_modified = self.client.get(url)['Last-Modified']
+        with mock.patch('posts.caching.time.time',
+                        return_value=time.time() + 5):
+            response = self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
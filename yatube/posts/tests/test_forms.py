@@ -10,6 +10,7 @@ from django.urls import reverse
 
 from ..forms import PostForm
 from ..models import Group, Post
+from ..storage import content_hash
 from ..utils import uploaded_img
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -66,7 +67,7 @@ class PostCreateFormTests(TestCase):
             (post.author, self.post.author),
             (post.text, self.post.text),
             (post.group, self.post.group),
-            (post.image, f'posts/{uploaded_img}'),
+            (post.image, f'posts/{content_hash(uploaded_img)}.gif'),
         )
         for new_post, expected in check_post_fields:
             with self.subTest(new_post=expected):
@@ -0,0 +1,125 @@
+import os
+import subprocess
+import sys
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.files.uploadedfile import (SimpleUploadedFile,
+                                            TemporaryUploadedFile)
+from django.test import TestCase
+from PIL import Image
+
+from .. import constants
+from ..forms import PostForm
+from ..images import process_upload
+
+ORIENTATION = 0x0112
+ROTATED_90 = 6
+
+PROC_STATUS = '/proc/self/status'
+# Пиковая память (VmHWM) отдельного процесса до и после обработки
+# файла: так учитываются и буферы Pillow вне Python. `ru_maxrss` не
+# годится: после fork/exec он наследует пик процесса тестов.
+PEAK_RSS_SCRIPT = """
+import os, sys
+import django
+django.setup()
+from django.core.files.uploadedfile import UploadedFile
+from posts.images import process_upload
+
+def peak_rss():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) * 1024
+
+path = sys.argv[1]
+with open(path, 'rb') as file:
+    upload = UploadedFile(file, 'photo.jpg', 'image/jpeg',
+                          os.path.getsize(path))
+    before = peak_rss()
+    process_upload(upload)
+    print(peak_rss() - before)
+"""
+
+
+def make_jpeg(size, **options):
+    """JPEG из шума во временном файле, как большая загрузка Django."""
+    upload = TemporaryUploadedFile('photo.jpg', 'image/jpeg', 0, None)
+    Image.effect_noise(size, 64).convert('RGB').save(
+        upload, 'JPEG', quality=95, **options)
+    upload.size = upload.tell()
+    upload.seek(0)
+    return upload
+
+
+def peak_rss_growth(path):
+    """Рост пиковой памяти при обработке файла, в байтах."""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='yatube.settings')
+    output = subprocess.run(
+        [sys.executable, '-c', PEAK_RSS_SCRIPT, path],
+        cwd=settings.BASE_DIR, env=env, check=True,
+        capture_output=True, text=True,
+    ).stdout
+    return int(output.split()[-1])
+
+
+class ImageUploadTests(TestCase):
+    def test_large_photo_is_downscaled_and_stripped(self):
+        """Большое фото уменьшается, поворачивается и теряет EXIF."""
+        exif = Image.Exif()
+        exif[ORIENTATION] = ROTATED_90
+        upload = make_jpeg((3000, 2000), exif=exif.tobytes())
+        form = PostForm(data={'text': 'фото'}, files={'image': upload})
+        self.assertTrue(form.is_valid(), form.errors)
+        image = Image.open(form.cleaned_data['image'])
+        self.assertEqual(max(image.size), constants.IMAGE_MAX_SIDE)
+        self.assertGreater(image.height, image.width)
+        self.assertNotIn('exif', image.info)
+
+    @skipUnless(os.path.exists(PROC_STATUS), f'нет {PROC_STATUS}')
+    def test_memory_is_bounded(self):
+        """Большой JPEG не декодируется целиком: пиковая память процесса
+        меньше половины несжатой картинки (байт на пиксель в `L`).
+        """
+        size = (8000, 6000)
+        upload = TemporaryUploadedFile('photo.jpg', 'image/jpeg', 0, None)
+        Image.linear_gradient('L').resize(size).save(upload, 'JPEG')
+        upload.flush()
+        self.assertLess(peak_rss_growth(upload.temporary_file_path()),
+                        size[0] * size[1] / 2)
+
+    @mock.patch.object(constants, 'IMAGE_MAX_DECODED_PIXELS', 100 * 100 - 1)
+    def test_formats_without_draft_have_lower_limit(self):
+        """PNG декодируется целиком, поэтому для него предел ниже; JPEG
+        того же размера проходит за счёт `draft`.
+        """
+        png = SimpleUploadedFile('big.png', b'', content_type='image/png')
+        Image.new('RGB', (100, 100)).save(png.file, 'PNG')
+        png.size = png.file.tell()
+        png.seek(0)
+        form = PostForm(data={'text': 'png'}, files={'image': png})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors['image'],
+                         ['Слишком большое разрешение изображения.'])
+        with mock.patch.object(constants, 'IMAGE_MAX_SIDE', 50):
+            process_upload(make_jpeg((100, 100)))
+
+    @mock.patch.object(constants, 'IMAGE_MAX_PIXELS', 100 * 100 - 1)
+    def test_too_many_pixels_rejected_before_decoding(self):
+        """Разрешение проверяется по заголовку, без декодирования."""
+        upload = make_jpeg((100, 100))
+        with mock.patch.object(Image.Image, 'load',
+                               side_effect=AssertionError('decoded')):
+            form = PostForm(data={'text': 'бомба'},
+                            files={'image': upload})
+            self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors['image'],
+                         ['Слишком большое разрешение изображения.'])
+
+    def test_small_gif_is_kept_as_is(self):
+        """Маленький GIF сохраняется без пересжатия."""
+        gif = SimpleUploadedFile('small.gif', b'', content_type='image/gif')
+        Image.new('P', (2, 1)).save(gif.file, 'GIF')
+        gif.size = gif.file.tell()
+        self.assertIs(process_upload(gif), gif)
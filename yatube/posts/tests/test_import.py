@@ -0,0 +1,178 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import search
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+from ..paginators import feed_count_key
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+class ImportCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='описание')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(TEMP_DIR, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def run_import(self, path, **options):
+        out = StringIO()
+        call_command('import_yatube', path, stdout=out, **options)
+        return out.getvalue()
+
+    def test_jsonl_import(self):
+        """Импорт JSONL сохраняет id и даты и обновляет производные данные."""
+        records = [
+            {'type': 'follow', 'user': 'reader', 'author': 'writer'},
+            {'type': 'post', 'id': 500, 'author': 'writer',
+             'group': 'group', 'text': 'Архивный пост',
+             'pub_date': '2015-03-01T10:00:00+00:00'},
+            {'type': 'post', 'id': 501, 'author': 'writer',
+             'text': 'Второй архивный пост'},
+            {'type': 'comment', 'post': 500, 'author': 'reader',
+             'text': 'Комментарий', 'created': '2015-03-02T10:00:00'},
+        ]
+        cache.set(feed_count_key('group', self.group.pk), 0)
+        path = self.write('archive.jsonl', '\n'.join(
+            json.dumps(record, ensure_ascii=False) for record in records))
+        out = self.run_import(path, batch_size=1, chunk_size=2)
+        self.assertIn('записей/с', out)
+
+        post = Post.objects.get(pk=500)
+        writer = User.objects.get(username='writer')
+        self.assertEqual(post.author, writer)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(
+            post.pub_date, timezone.make_aware(datetime(2015, 3, 1, 10)))
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(Comment.objects.get().created.year, 2015)
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=writer).exists())
+        self.assertEqual(writer.stats.posts, 2)
+        self.assertEqual(
+            User.objects.get(pk=self.reader.pk).stats.following, 1)
+        self.assertEqual(TimelineEntry.objects.filter(
+            user=self.reader).count(), 2)
+        self.assertEqual(
+            {found.pk for found in search.search_posts('архивный')},
+            {500, 501})
+        self.assertIsNone(cache.get(feed_count_key('group', self.group.pk)))
+        self.assertGreater(Post.objects.create(
+            author=writer, text='новый').pk, 501)
+
+    def test_csv_import(self):
+        """CSV с общим заголовком: пустые ячейки пропускаются."""
+        path = self.write('archive.csv', (
+            'type,id,author,group,text,post,user\n'
+            'post,7,writer,,Пост из CSV,,\n'
+            'comment,,reader,,Ответ,7,\n'
+        ))
+        self.run_import(path)
+        post = Post.objects.get(pk=7)
+        self.assertIsNone(post.group)
+        self.assertEqual(post.comments.get().author, self.reader)
+
+    def test_bad_record_is_reported(self):
+        """Ошибка в записи останавливает импорт с номером записи."""
+        path = self.write('broken.jsonl', (
+            '{"type": "post", "author": "writer", "text": "ok"}\n'
+            '{"type": "unknown"}\n'
+        ))
+        with self.assertRaisesMessage(CommandError, 'Запись 2'):
+            self.run_import(path)
+
+    def test_taken_ids_are_skipped_with_comments(self):
+        """Пост с занятым id не импортируется, его комментарии не
+        достаются чужому посту.
+        """
+        existing = Post.objects.create(author=self.reader, text='свой')
+        records = [
+            {'type': 'post', 'id': existing.pk, 'author': 'writer',
+             'text': 'чужой'},
+            {'type': 'post', 'author': 'writer', 'text': 'без id'},
+            {'type': 'comment', 'post': existing.pk, 'author': 'reader',
+             'text': 'к чужому'},
+        ]
+        path = self.write('taken.jsonl', '\n'.join(
+            json.dumps(record) for record in records))
+        err = StringIO()
+        out = self.run_import(path, stderr=err)
+        self.assertIn('Импортировано постов: 1, комментариев: 0', out)
+        self.assertIn('Пропущено постов с занятым id: 1, комментариев к '
+                      'ним: 1', out)
+        self.assertIn('Запись 1', err.getvalue())
+        existing.refresh_from_db()
+        self.assertEqual(existing.text, 'свой')
+        self.assertFalse(existing.comments.exists())
+        self.assertEqual(
+            [found.text for found in search.search_posts('без')], ['без id'])
+
+    def test_comment_to_missing_post_is_reported(self):
+        """Комментарий к несуществующему посту — ошибка с номером записи."""
+        path = self.write('orphan.jsonl', (
+            '{"type": "post", "id": 900, "author": "writer", "text": "a"}\n'
+            '{"type": "comment", "post": 901, "author": "reader", '
+            '"text": "b"}\n'
+        ))
+        with self.assertRaisesMessage(CommandError, 'Запись 2'):
+            self.run_import(path)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_failed_import_finishes_written_chunks(self):
+        """Ошибка после первой пачки не оставляет записанное без
+        счётчиков и лент.
+        """
+        Follow.objects.create(
+            user=self.reader,
+            author=User.objects.create_user(username='writer'))
+        path = self.write('partial.jsonl', (
+            '{"type": "post", "author": "writer", "text": "первый"}\n'
+            '{"type": "unknown"}\n'
+        ))
+        with self.assertRaisesMessage(CommandError, 'Запись 2'):
+            self.run_import(path, chunk_size=1)
+        writer = User.objects.get(username='writer')
+        self.assertEqual(writer.stats.posts, 1)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 1)
+
+    def test_recount_touches_only_commented_posts(self):
+        """Счётчик комментариев пересчитывается только у затронутых
+        постов.
+        """
+        other = Post.objects.create(author=self.reader, text='другой')
+        Post.objects.filter(pk=other.pk).update(comments_count=7)
+        path = self.write('comments.jsonl', (
+            '{"type": "post", "id": 950, "author": "writer", "text": "a"}\n'
+            '{"type": "comment", "post": 950, "author": "reader", '
+            '"text": "b"}\n'
+        ))
+        self.run_import(path)
+        self.assertEqual(Post.objects.get(pk=950).comments_count, 1)
+        self.assertEqual(Post.objects.get(pk=other.pk).comments_count, 7)
@@ -0,0 +1,153 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import constants
+from ..models import Group, Post
+from ..paginators import (CachedCountPaginator, KeysetPaginator,
+                          feed_count_key)
+
+User = get_user_model()
+
+
+class KeysetPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='test_username')
+        cls.posts = [Post.objects.create(
+            author=cls.user,
+            text=f'test post {i}',
+        )
+            for i in range(constants.POSTS_PER_PAGE
+                           + constants.POSTS_PER_SECOND_PAGE)]
+
+    def setUp(self):
+        self.paginator = KeysetPaginator(
+            Post.objects.all(), constants.POSTS_PER_PAGE)
+
+    def test_cursor_pages_cover_all_posts(self):
+        """Курсоры ведут по всем постам без пропусков и повторов."""
+        first_page = self.paginator.get_cursor_page()
+        second_page = self.paginator.get_cursor_page(
+            after=first_page.next_cursor)
+        self.assertEqual(len(first_page), constants.POSTS_PER_PAGE)
+        self.assertEqual(len(second_page), constants.POSTS_PER_SECOND_PAGE)
+        self.assertTrue(first_page.has_next())
+        self.assertFalse(first_page.has_previous())
+        self.assertFalse(second_page.has_next())
+        self.assertTrue(second_page.has_previous())
+        self.assertEqual(
+            list(first_page) + list(second_page),
+            list(Post.objects.order_by('-pub_date', '-id')),
+        )
+
+    def test_before_cursor_returns_previous_page(self):
+        """Курсор `before` возвращает предыдущую страницу."""
+        first_page = self.paginator.get_cursor_page()
+        second_page = self.paginator.get_cursor_page(
+            after=first_page.next_cursor)
+        previous_page = self.paginator.get_cursor_page(
+            before=second_page.previous_cursor)
+        self.assertEqual(list(previous_page), list(first_page))
+        self.assertFalse(previous_page.has_previous())
+        self.assertEqual(previous_page.number, 1)
+
+    def test_broken_cursor_returns_first_page(self):
+        """Некорректный курсор не ломает страницу."""
+        page = self.paginator.get_cursor_page(after='not-a-cursor')
+        self.assertEqual(list(page), list(self.paginator.page(1)))
+
+    def test_cursor_page_does_not_use_offset(self):
+        """Страница по курсору не использует OFFSET и COUNT."""
+        first_page = self.paginator.get_cursor_page()
+        with CaptureQueriesContext(connection) as queries:
+            self.paginator.get_cursor_page(after=first_page.next_cursor)
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]['sql'].upper()
+        self.assertNotIn('OFFSET', sql)
+        self.assertNotIn('COUNT(', sql)
+
+    def test_feed_accepts_cursor_and_page_number(self):
+        """Ленты понимают и курсор, и старый номер страницы."""
+        cache.clear()
+        client = Client()
+        first_page = self.paginator.get_cursor_page()
+        url = reverse('posts:profile', args=(self.user.username,))
+        by_cursor = client.get(url, {'after': first_page.next_cursor})
+        by_number = client.get(url, {'page': 2})
+        self.assertEqual(list(by_cursor.context['page_obj']),
+                         list(by_number.context['page_obj']))
+        self.assertContains(by_number, '?before=')
+
+
+class CachedCountPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='test_username')
+        cls.group = Group.objects.create(
+            title='test title',
+            slug='1',
+            description='test description',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='test post',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_paginator(self, key):
+        return CachedCountPaginator(
+            Post.objects.all(), constants.POSTS_PER_PAGE, count_key=key)
+
+    def test_count_is_taken_from_cache(self):
+        """Повторный подсчёт берётся из кэша без COUNT(*)."""
+        key = feed_count_key('index')
+        self.assertEqual(self.get_paginator(key).count, 1)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get_paginator(key).count, 1)
+        self.assertEqual(len(queries), 0)
+
+    def test_signals_keep_counts_up_to_date(self):
+        """Создание, перенос и удаление поста меняют счётчики лент."""
+        group_2 = Group.objects.create(title='test title2', slug='2')
+        index_key = feed_count_key('index')
+        group_key = feed_count_key('group', self.group.pk)
+        group_2_key = feed_count_key('group', group_2.pk)
+        for key in (index_key, group_key, group_2_key):
+            cache.set(key, 0)
+        post = Post.objects.create(
+            author=self.user, text='new post', group=self.group)
+        self.assertEqual(cache.get(index_key), 1)
+        self.assertEqual(cache.get(group_key), 1)
+        post.group = group_2
+        post.save()
+        self.assertEqual(cache.get(group_key), 0)
+        self.assertEqual(cache.get(group_2_key), 1)
+        post.delete()
+        self.assertEqual(cache.get(index_key), 0)
+        self.assertEqual(cache.get(group_2_key), 0)
+
+    def test_estimate_is_used_for_huge_tables(self):
+        """Для огромной таблицы берётся оценка, а не COUNT(*)."""
+        estimate = constants.EXACT_COUNT_LIMIT * 10
+        with mock.patch('posts.paginators.estimate_count',
+                        return_value=estimate):
+            paginator = self.get_paginator(feed_count_key('index'))
+            self.assertEqual(paginator.count, estimate)
+
+    def test_page_window_is_elided(self):
+        """Ссылки есть только на крайние и соседние страницы."""
+        key = feed_count_key('index')
+        cache.set(key, constants.POSTS_PER_PAGE * 50)
+        window = self.get_paginator(key).page_window(25, on_each_side=2)
+        self.assertEqual(window, [1, None, 23, 24, 25, 26, 27, None, 50])
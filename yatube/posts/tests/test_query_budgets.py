@@ -0,0 +1,147 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.testing import QueryBudgetTestMixin
+from .. import constants, thumbnails
+from ..models import Comment, Follow, Group, Post
+from ..paginators import KeysetPaginator
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+def make_image(seed):
+    """Маленький GIF с уникальным содержимым: свой файл и миниатюра."""
+    content = BytesIO()
+    Image.new('RGB', (2, 1), (seed % 256, seed // 256 % 256, 0)).save(
+        content, 'GIF')
+    return SimpleUploadedFile(f'img_{seed}.gif', content.getvalue(),
+                              content_type='image/gif')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, QUERY_BUDGET_RAISE=True)
+class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    """Страницы `posts` укладываются в бюджет, и число запросов не
+    зависит от объёма данных. Худший случай: читатель вошёл, у постов
+    картинки, миниатюры не в кэше процесса.
+    """
+
+    images = 0
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='test title',
+            slug='test-slug',
+            description='test description',
+        )
+        cls.star = User.objects.create_user(username='star')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.author, author=cls.star)
+        cls.post = cls.create_posts(cls.author, 1)[0]
+        cls.oldest = cls.create_posts(
+            cls.star, constants.POSTS_PER_PAGE + 1)[0]
+        cls.create_posts(cls.reader, 1)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def next_image(cls):
+        cls.images += 1
+        return make_image(cls.images)
+
+    @classmethod
+    def create_posts(cls, author, count):
+        posts = [
+            Post.objects.create(author=author, text=f'test post {i}',
+                                group=cls.group, image=cls.next_image())
+            for i in range(count)
+        ]
+        for post in posts:
+            thumbnails.generate_thumbnails(post.image.name)
+            Comment.objects.create(
+                post=post, author=cls.reader, text='test comment')
+        return posts
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def count_queries(self, client, url, data=None):
+        thumbnails.resolved.clear()
+        return super().count_queries(client, url, data)
+
+    def grow(self):
+        for i in range(5):
+            author = User.objects.create_user(username=f'author_{i}')
+            Follow.objects.create(user=self.reader, author=author)
+            Follow.objects.create(user=author, author=self.author)
+            Follow.objects.create(user=self.author, author=author)
+            self.create_posts(author, 5)
+        self.create_posts(self.author, 15)
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.reader, text=str(i))
+            for i in range(30)
+        )
+
+    def last_cursor(self):
+        """Курсор последней неполной страницы ленты подписок."""
+        paginator = KeysetPaginator(Post.objects.all(), 1)
+        return paginator.encode_cursor(
+            {'pub_date': self.oldest.pub_date, 'id': self.oldest.pk + 1})
+
+    def edit_data(self):
+        image = self.next_image()
+        return {'text': f'edited {self.images}', 'group': self.group.pk,
+                'image': image}
+
+    def test_pages_have_constant_query_count(self):
+        """Число запросов страниц не растёт вместе с данными."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:profile', args=(self.reader.username,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+            reverse('posts:post_comments', args=(self.post.pk,)),
+            reverse('posts:follow_index'),
+            reverse('posts:follow_index') + '?after=' + self.last_cursor(),
+            reverse('posts:post_edit', args=(self.post.pk,)),
+            reverse('posts:search') + '?q=test',
+            reverse('posts:api_index'),
+            reverse('posts:api_group_list', args=(self.group.slug,)),
+            reverse('posts:api_profile', args=(self.author.username,)),
+            reverse('posts:api_post_detail', args=(self.post.pk,)),
+            reverse('posts:group_index'),
+            reverse('posts:index_feed', args=('rss',)),
+            reverse('posts:group_feed', args=(self.group.slug, 'atom')),
+            reverse('posts:profile_feed', args=(self.author.username, 'rss')),
+        )
+        self.assertConstantQueries(self.client, urls, self.grow)
+
+    def test_writes_have_constant_query_count(self):
+        """Правка поста, комментарий и подписки укладываются в бюджет."""
+        requests = (
+            (reverse('posts:post_edit', args=(self.post.pk,)),
+             self.edit_data),
+            (reverse('posts:add_comment', args=(self.post.pk,)),
+             {'text': 'comment'}),
+            reverse('posts:profile_follow', args=(self.reader.username,)),
+            reverse('posts:profile_unfollow', args=(self.reader.username,)),
+        )
+        self.assertConstantQueries(self.client, requests, self.grow)
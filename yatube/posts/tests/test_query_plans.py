@@ -0,0 +1,92 @@
+import re
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import constants
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+FULL_SCAN = re.compile(r'\bSCAN (TABLE )?\w+$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+@mock.patch.object(constants, 'TIMELINE_PUSH_FOLLOWERS_LIMIT', 1)
+class QueryPlanTests(TestCase):
+    """Запросы страниц `posts` не сканируют таблицы целиком и не
+    сортируют во временном B-дереве.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.reader_2 = User.objects.create_user(username='reader_2')
+        cls.author = User.objects.create_user(username='author')
+        cls.celebrity = User.objects.create_user(username='celebrity')
+        cls.group = Group.objects.create(
+            title='test title',
+            slug='test-slug',
+            description='test description',
+        )
+        for user in (cls.reader, cls.reader_2):
+            Follow.objects.create(user=user, author=cls.celebrity)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.posts = [
+            Post.objects.create(author=author, text='test post',
+                                group=cls.group)
+            for author in (cls.author, cls.celebrity)
+            for _ in range(constants.POSTS_PER_PAGE)
+        ]
+        for post in cls.posts[:3]:
+            Comment.objects.create(
+                post=post, author=cls.reader, text='test comment')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def get_urls(self):
+        post = self.posts[0]
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:post_detail', args=(post.pk,)),
+            reverse('posts:follow_index'),
+        ]
+        next_pages = []
+        for url in urls:
+            response = self.client.get(url)
+            page_obj = response.context.get('page_obj')
+            if page_obj is not None and page_obj.next_cursor:
+                next_pages.append(f'{url}?after={page_obj.next_cursor}')
+        cache.clear()
+        return urls + next_pages
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def test_views_use_indexes(self):
+        """Каждый SELECT страницы идёт по индексу и без сортировки."""
+        for url in self.get_urls():
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            for query in queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT') or 'sqlite_' in sql:
+                    continue
+                for step in self.explain(sql):
+                    with self.subTest(url=url, sql=sql, step=step):
+                        self.assertNotIn(TEMP_SORT, step)
+                        self.assertIsNone(FULL_SCAN.search(step))
@@ -0,0 +1,99 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import constants, search
+from ..models import Post
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        cache.clear()
+
+    def create(self, text):
+        return Post.objects.create(author=self.user, text=text)
+
+    def test_results_are_ranked(self):
+        """Более релевантный пост идёт первым."""
+        weak = self.create('Про котов и немного про собак ' + 'слово ' * 30)
+        strong = self.create('Коты, коты и ещё раз коты')
+        self.create('Совсем про другое')
+        self.assertEqual(search.search_posts('коты'), [strong])
+        self.assertEqual(search.search_posts('кот'), [strong, weak])
+
+    def test_cursor_pagination(self):
+        """Курсор проходит все совпадения без повторов."""
+        posts = {self.create(f'Рыба номер {i}') for i in range(5)}
+        self.create('Без совпадений')
+        seen, after = [], None
+        while True:
+            page = search.search_posts('рыба', after, per_page=2)
+            self.assertLessEqual(len(page), 2)
+            seen.extend(page)
+            after = page.next_cursor
+            if after is None:
+                break
+        self.assertEqual(len(seen), len(posts))
+        self.assertEqual(set(seen), posts)
+
+    @mock.patch.object(constants, 'SEARCH_CANDIDATES', 2)
+    def test_only_newest_matches_are_ranked(self):
+        """Ранжируются только самые свежие совпадения."""
+        self.create('Сова, сова и ещё раз сова')
+        newest = [self.create(f'Сова номер {i}') for i in range(2)]
+        self.assertEqual(set(search.search_posts('сова')), set(newest))
+
+    def test_index_follows_edit_and_delete(self):
+        """Индекс обновляется при правке и удалении поста."""
+        post = self.create('Старый текст')
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(search.search_posts('старый'), [])
+        self.assertEqual(search.search_posts('новый'), [post])
+        post.delete()
+        self.assertEqual(search.search_posts('новый'), [])
+
+    def test_query_operators_are_not_passed_through(self):
+        """Операторы FTS5 в запросе не ломают поиск."""
+        post = self.create('Запрос с кавычками')
+        self.assertEqual(search.search_posts('"кавычками" ^ -('),
+                         [post])
+        self.assertEqual(search.search_posts('***'), [])
+
+    def test_rebuild_command(self):
+        """Команда восстанавливает индекс по таблице постов."""
+        post = self.create('Переиндексация')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.FTS_TABLE}')
+        self.assertEqual(search.search_posts('переиндексация'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('1', out.getvalue())
+        self.assertEqual(search.search_posts('переиндексация'), [post])
+
+    def test_search_view(self):
+        """Страница поиска показывает найденные посты и ссылку дальше."""
+        for i in range(11):
+            self.create(f'Поисковый пост {i}')
+        self.create('Посторонний')
+        response = Client().get(reverse('posts:search'), {'q': 'поисковый'})
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertContains(response, 'Поисковый пост')
+        self.assertNotContains(response, 'Посторонний')
+        after = response.context['page_obj'].next_cursor
+        self.assertContains(response, f'after={after}')
+        response = Client().get(reverse('posts:search'),
+                                {'q': 'поисковый', 'after': after})
+        self.assertEqual(len(response.context['page_obj']), 1)
@@ -0,0 +1,220 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Follow, Group, GroupStats, Post, UserStats
+
+User = get_user_model()
+
+
+class UserStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+
+    def get_stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        """Посты, комментарии и подписки обновляют счётчики."""
+        post = Post.objects.create(author=self.author, text='test post')
+        Comment.objects.create(post=post, author=self.user, text='test')
+        Follow.objects.create(user=self.user, author=self.author)
+        author_stats = self.get_stats(self.author)
+        user_stats = self.get_stats(self.user)
+        self.assertEqual(author_stats.posts, 1)
+        self.assertEqual(author_stats.followers, 1)
+        self.assertEqual(user_stats.following, 1)
+        self.assertEqual(user_stats.comments, 1)
+        post.delete()
+        self.assertEqual(self.get_stats(self.author).posts, 0)
+        self.assertEqual(self.get_stats(self.user).comments, 0)
+
+    def test_repair_command_fixes_drift(self):
+        """Команда восстанавливает испорченные счётчики."""
+        Post.objects.create(author=self.author, text='test post')
+        UserStats.objects.filter(user=self.author).update(posts=42)
+        UserStats.objects.filter(user=self.user).delete()
+        out = StringIO()
+        call_command('repair_user_stats', stdout=out)
+        self.assertEqual(self.get_stats(self.author).posts, 1)
+        self.assertEqual(self.get_stats(self.user).posts, 0)
+        self.assertIn('исправлено: 1', out.getvalue())
+
+    def test_pages_do_not_count_author_posts(self):
+        """Страницы поста и профиля не считают посты автора COUNT-ом."""
+        post = Post.objects.create(author=self.author, text='test post')
+        pages = (
+            (reverse('posts:post_detail', args=(post.pk,)),
+             'Всего постов автора:  <span >1</span>'),
+            (reverse('posts:profile', args=(self.author.username,)),
+             '<h3>Всего постов: 1 </h3>'),
+        )
+        client = Client()
+        for url, counter in pages:
+            with self.subTest(url=url):
+                client.get(url)
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(url)
+                self.assertContains(response, counter, count=1)
+                counts = [query['sql'] for query in queries
+                          if 'COUNT(' in query['sql'].upper()]
+                self.assertEqual(counts, [])
+
+
+class CommentsCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.commentator = User.objects.create_user(username='commentator')
+        cls.post = Post.objects.create(author=cls.author, text='test post')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.commentator)
+
+    def get_count(self):
+        return Post.objects.get(pk=self.post.pk).comments_count
+
+    def test_add_and_delete_comments(self):
+        """Счётчик следит за добавлением и удалением комментариев."""
+        self.client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            {'text': 'test comment'})
+        self.assertEqual(self.get_count(), 1)
+        Comment.objects.filter(post=self.post).delete()
+        self.assertEqual(self.get_count(), 0)
+
+    def test_cascade_delete_updates_count(self):
+        """Удаление автора комментариев уменьшает счётчик."""
+        user = User.objects.create_user(username='temp')
+        Comment.objects.create(post=self.post, author=user, text='test')
+        Comment.objects.create(post=self.post, author=user, text='test')
+        self.assertEqual(self.get_count(), 2)
+        user.delete()
+        self.assertEqual(self.get_count(), 0)
+
+    def test_check_command_fixes_counts(self):
+        """Команда находит и исправляет расхождения."""
+        Post.objects.filter(pk=self.post.pk).update(comments_count=5)
+        out = StringIO()
+        call_command('check_comment_counts', stdout=out, stderr=StringIO())
+        self.assertIn(f'Пост {self.post.pk}', out.getvalue())
+        self.assertEqual(self.get_count(), 5)
+        call_command('check_comment_counts', fix=True, stdout=StringIO())
+        self.assertEqual(self.get_count(), 0)
+
+    def test_feed_shows_counts_without_extra_queries(self):
+        """Лента показывает число комментариев без запроса на пост."""
+        Comment.objects.create(
+            post=self.post, author=self.commentator, text='test')
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        self.assertContains(response, 'комментариев: 1')
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        comment_queries = [query['sql'] for query in queries
+                           if 'posts_comment' in query['sql']]
+        self.assertEqual(comment_queries, [])
+
+
+class GroupStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='описание')
+        cls.other = Group.objects.create(
+            title='Другая', slug='other', description='описание')
+
+    def setUp(self):
+        cache.clear()
+
+    def get_stats(self, group):
+        return GroupStats.objects.get(group=group)
+
+    def test_stats_follow_posts(self):
+        """Посты, их перенос и удаление обновляют статистику групп."""
+        first = Post.objects.create(
+            author=self.author, text='первый', group=self.group)
+        second = Post.objects.create(
+            author=self.author, text='второй', group=self.group)
+        stats = self.get_stats(self.group)
+        self.assertEqual((stats.posts, stats.recent_posts), (2, 2))
+        self.assertEqual(stats.last_post, second.pub_date)
+
+        second.group = self.other
+        second.save()
+        stats = self.get_stats(self.group)
+        self.assertEqual((stats.posts, stats.recent_posts), (1, 1))
+        self.assertEqual(stats.last_post, first.pub_date)
+        self.assertEqual(self.get_stats(self.other).posts, 1)
+
+        first.delete()
+        stats = self.get_stats(self.group)
+        self.assertEqual((stats.posts, stats.recent_posts), (0, 0))
+        self.assertIsNone(stats.last_post)
+
+    def test_deferred_group_is_not_counted_twice(self):
+        """Сохранение поста, загруженного без группы, не сдвигает
+        статистику, а перенос такого поста учитывается один раз.
+        """
+        post = Post.objects.create(
+            author=self.author, text='пост', group=self.group)
+        loaded = Post.objects.only('text').get(pk=post.pk)
+        loaded.text = 'правка'
+        loaded.save()
+        self.assertEqual(self.get_stats(self.group).posts, 1)
+        self.assertEqual(self.get_stats(self.other).posts, 0)
+
+        loaded = Post.objects.only('text').get(pk=post.pk)
+        loaded.group = self.other
+        loaded.save()
+        self.assertEqual(self.get_stats(self.group).posts, 0)
+        self.assertEqual(self.get_stats(self.other).posts, 1)
+
+    def test_recount_drops_old_posts_from_recent(self):
+        """Пересчёт убирает из недельного счётчика старые посты."""
+        post = Post.objects.create(
+            author=self.author, text='старый', group=self.group)
+        Post.objects.filter(pk=post.pk).update(
+            pub_date=timezone.now() - timedelta(days=30))
+        GroupStats.objects.filter(group=self.other).delete()
+        out = StringIO()
+        call_command('recount_group_stats', stdout=out)
+        stats = self.get_stats(self.group)
+        self.assertEqual((stats.posts, stats.recent_posts), (1, 0))
+        self.assertEqual(self.get_stats(self.other).posts, 0)
+        self.assertIn('Создано записей: 1, исправлено: 1', out.getvalue())
+
+    def test_directory_is_one_query(self):
+        """Каталог групп читает только таблицу статистики, без постов."""
+        Post.objects.create(
+            author=self.author, text='пост', group=self.other)
+        url = reverse('posts:group_index')
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get(url)
+        self.assertEqual(
+            [stats.group for stats in response.context['page_obj']],
+            [self.other, self.group])
+        self.assertContains(response, self.other.title)
+        selects = [query['sql'] for query in queries.captured_queries
+                   if 'posts_groupstats' in query['sql']]
+        self.assertEqual(len(selects), 2)
+        self.assertNotIn('posts_post', ' '.join(selects))
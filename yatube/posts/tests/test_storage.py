@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .. import thumbnails
+from ..management.commands import collect_images
+from ..models import Post, StoredImage
+from ..utils import small_gif
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        shutil.rmtree(os.path.join(TEMP_MEDIA_ROOT, 'posts'),
+                      ignore_errors=True)
+
+    def create_post(self, name='repost.gif', content=small_gif):
+        return Post.objects.create(
+            author=self.user, text='text',
+            image=SimpleUploadedFile(name, content))
+
+    def upload_files(self):
+        return os.listdir(os.path.join(TEMP_MEDIA_ROOT, 'posts'))
+
+    def test_duplicate_upload_is_stored_once(self):
+        """Одинаковые картинки хранятся одним файлом со счётчиком ссылок."""
+        first = self.create_post('first.gif')
+        second = self.create_post('second.GIF')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(self.upload_files(),
+                         [os.path.basename(first.image.name)])
+        self.assertEqual(
+            StoredImage.objects.get(name=first.image.name).refs, 2)
+
+    def test_duplicate_reuses_thumbnails(self):
+        """Для повторной картинки миниатюры не генерируются заново."""
+        first = self.create_post()
+        srcset = thumbnails.generate_thumbnails(first.image.name)
+        thumbnails.save_srcset(first.pk, first.image.name, srcset)
+        second = self.create_post()
+        with mock.patch.object(thumbnails.transaction,
+                               'on_commit') as on_commit:
+            thumbnails.enqueue_thumbnails(second)
+        on_commit.assert_not_called()
+        second.refresh_from_db()
+        self.assertEqual(second.image_srcset, srcset)
+
+    def test_unreferenced_images_are_collected(self):
+        """Сборщик удаляет только файлы без ссылок."""
+        kept = self.create_post('kept.gif', small_gif + b'kept')
+        removed = self.create_post('removed.gif')
+        removed_name = removed.image.name
+        removed.delete()
+        self.assertEqual(StoredImage.objects.get(name=removed_name).refs, 0)
+
+        call_command('collect_images', grace=0, dry_run=True,
+                     stdout=StringIO())
+        self.assertEqual(len(self.upload_files()), 2)
+        call_command('collect_images', grace=0, stdout=StringIO())
+        self.assertEqual(self.upload_files(),
+                         [os.path.basename(kept.image.name)])
+        self.assertFalse(
+            StoredImage.objects.filter(name=removed_name).exists())
+
+    def test_foreign_files_are_kept(self):
+        """Файлы, которые назвало не хранилище, сборщик не трогает."""
+        directory = os.path.join(TEMP_MEDIA_ROOT, 'posts')
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'manual.gif'), 'wb') as file:
+            file.write(small_gif)
+        call_command('collect_images', grace=0, stdout=StringIO())
+        self.assertIn('manual.gif', self.upload_files())
+
+    def test_reuploaded_image_survives_collection(self):
+        """Файл, загруженный снова после выборки сборщика, остаётся."""
+        post = self.create_post('again.gif', small_gif + b'again')
+        name = post.image.name
+        post.delete()
+        cutoff = timezone.now()
+        StoredImage.objects.filter(name=name).update(
+            updated=cutoff - timedelta(days=1))
+        old = (cutoff - timedelta(days=1)).timestamp()
+        os.utime(post.image.path, (old, old))
+
+        post.image.storage.save('posts/again.gif', SimpleUploadedFile(
+            'again.gif', small_gif + b'again'))
+        self.assertFalse(collect_images.Command().delete_unused(name, cutoff))
+        self.assertIn(os.path.basename(name), self.upload_files())
@@ -0,0 +1,155 @@
+import shutil
+import tempfile
+from concurrent.futures import Future
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import get_thumbnail
+
+from .. import sorl_compat, thumbnails
+from ..models import Post
+from ..utils import small_gif
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def make_image(self, name):
+        return SimpleUploadedFile(name, small_gif, content_type='image/gif')
+
+    def test_post_create_enqueues_thumbnails(self):
+        """Новый пост с картинкой ставит миниатюры в очередь."""
+        with mock.patch('posts.views.enqueue_thumbnails') as enqueue:
+            self.client.post(reverse('posts:post_create'), {
+                'text': 'с картинкой',
+                'image': self.make_image('queued.gif'),
+            })
+        enqueue.assert_called_once_with(Post.objects.get())
+
+    def test_page_falls_back_to_original_until_ready(self):
+        """До готовности миниатюры страница показывает исходник."""
+        post = Post.objects.create(
+            author=self.user, text='text', image=self.make_image('ready.gif'))
+        url = reverse('posts:post_detail', args=(post.pk,))
+        self.assertIsNone(thumbnails.ready_thumbnail(
+            post.image, '960x339', crop='center', upscale=True))
+        self.assertContains(self.client.get(url), post.image.url)
+
+        future = Future()
+        future.set_result(thumbnails.generate_thumbnails(post.image.name))
+        thumbnails._thumbnails_done(post.pk, post.image.name, future)
+
+        thumbnail = thumbnails.ready_thumbnail(
+            post.image, '960x339', crop='center', upscale=True)
+        self.assertIsNotNone(thumbnail)
+        response = self.client.get(url)
+        self.assertContains(response, thumbnail.url)
+        self.assertNotContains(response, f'src="{post.image.url}"')
+
+    def test_page_thumbnails_are_preloaded_at_once(self):
+        """Миниатюры страницы разрешаются одним запросом, дальше из LRU."""
+        posts = [
+            Post.objects.create(author=self.user, text=str(i),
+                                image=self.make_image(f'page_{i}.gif'))
+            for i in range(3)
+        ]
+        for post in posts:
+            thumbnails.generate_thumbnails(post.image.name)
+        cache.clear()
+        thumbnails.resolved.clear()
+        with self.assertNumQueries(1):
+            thumbnails.preload_thumbnails(posts)
+        with self.assertNumQueries(0):
+            for post in posts:
+                self.assertIsNotNone(thumbnails.ready_thumbnail(
+                    post.image, '960x339', crop='center', upscale=True))
+
+    def test_missing_thumbnails_are_not_looked_up_twice(self):
+        """Отсутствие миниатюры после предзагрузки не даёт запросов на
+        каждую карточку.
+        """
+        posts = [
+            Post.objects.create(author=self.user, text=str(i),
+                                image=self.make_image(f'missing_{i}.gif'))
+            for i in range(3)
+        ]
+        cache.clear()
+        thumbnails.resolved.clear()
+        with self.assertNumQueries(1):
+            thumbnails.preload_thumbnails(posts)
+        with self.assertNumQueries(0):
+            for post in posts:
+                self.assertIsNone(thumbnails.ready_thumbnail(
+                    post.image, '960x339', crop='center', upscale=True))
+
+    def test_lru_evicts_least_recently_used(self):
+        """LRU вытесняет давно не использованные записи."""
+        lru = thumbnails.LRUCache(2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual((lru.get('a'), lru.get('b'), lru.get('c')),
+                         (1, None, 3))
+
+    def test_srcset_variants_are_recorded(self):
+        """Варианты по ширине записываются в пост и попадают в srcset."""
+        post = Post.objects.create(
+            author=self.user, text='text', image=self.make_image('wide.gif'))
+        future = Future()
+        future.set_result(thumbnails.generate_thumbnails(post.image.name))
+        thumbnails._thumbnails_done(post.pk, post.image.name, future)
+        post.refresh_from_db()
+        # Картинка 2x1 не увеличивается: остаётся один вариант.
+        self.assertRegex(post.image_srcset, r'^\S+ 2w$')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, f'srcset="{post.image_srcset}"')
+        self.assertContains(response, 'loading="lazy"')
+
+    def test_stale_srcset_is_not_saved(self):
+        """srcset старой картинки не перезаписывает новую."""
+        post = Post.objects.create(
+            author=self.user, text='text', image=self.make_image('old.gif'))
+        thumbnails.save_srcset(post.pk, 'posts/other.gif', 'x.jpg 480w')
+        post.refresh_from_db()
+        self.assertEqual(post.image_srcset, '')
+
+    def test_sorl_internals_match_installed_version(self):
+        """Адаптер к внутренностям sorl совпадает с установленной версией:
+        имя миниатюры и запись key-value store такие же, как у sorl.
+        """
+        self.assertEqual(sorl_compat.installed_version(),
+                         sorl_compat.SORL_VERSION)
+        post = Post.objects.create(
+            author=self.user, text='text', image=self.make_image('sorl.gif'))
+        geometry, options = thumbnails.variant_geometries()[0]
+        thumbnail = get_thumbnail(post.image.name, geometry, **options)
+        self.assertEqual(sorl_compat.thumbnail_filename(
+            post.image.name, geometry, options), thumbnail.name)
+        cache.clear()
+        stored = sorl_compat.stored_thumbnails([thumbnail.name, 'missing'])
+        self.assertEqual(list(stored), [thumbnail.name])
+        self.assertEqual(stored[thumbnail.name].url, thumbnail.url)
@@ -0,0 +1,192 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import constants, timeline
+from ..models import Follow, Post, TimelineEntry, UserStats
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_follower = User.objects.create_user(username='user')
+        cls.user_following = User.objects.create_user(username='user_1')
+        cls.old_post = Post.objects.create(
+            author=cls.user_following,
+            text='Старый пост',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.follower_client = Client()
+        self.follower_client.force_login(self.user_follower)
+
+    def get_timeline_posts(self):
+        return [entry.post for entry in TimelineEntry.objects.filter(
+            user=self.user_follower).order_by('-pub_date', '-post_id')]
+
+    def test_follow_backfills_timeline(self):
+        """После подписки в ленте появляются старые посты автора."""
+        self.follower_client.get(reverse(
+            'posts:profile_follow', args=(self.user_following.username,)))
+        self.assertEqual(self.get_timeline_posts(), [self.old_post])
+
+    def test_new_post_is_pushed_to_followers(self):
+        """Новый пост сразу попадает в ленту подписчика."""
+        Follow.objects.create(
+            user=self.user_follower, author=self.user_following)
+        new_post = Post.objects.create(
+            author=self.user_following, text='Новый пост')
+        self.assertEqual(self.get_timeline_posts(),
+                         [new_post, self.old_post])
+        response = self.follower_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [new_post, self.old_post])
+
+    def test_unfollow_prunes_timeline(self):
+        """После отписки посты автора пропадают из ленты."""
+        Follow.objects.create(
+            user=self.user_follower, author=self.user_following)
+        self.follower_client.get(reverse(
+            'posts:profile_unfollow', args=(self.user_following.username,)))
+        self.assertEqual(self.get_timeline_posts(), [])
+
+    def test_timeline_is_capped(self):
+        """В ленте хранятся только самые свежие записи."""
+        Follow.objects.create(
+            user=self.user_follower, author=self.user_following)
+        posts = [
+            Post.objects.create(author=self.user_following, text=str(i))
+            for i in range(3)
+        ]
+        timeline.trim(self.user_follower.pk, limit=2)
+        self.assertEqual(self.get_timeline_posts(), posts[:0:-1])
+
+    @mock.patch.object(constants, 'TIMELINE_MAX_ENTRIES', 3)
+    def test_cursor_pages_continue_past_trimmed_timeline(self):
+        """За концом обрезанной ленты курсоры идут по тем же постам,
+        что номера страниц.
+        """
+        Follow.objects.create(
+            user=self.user_follower, author=self.user_following)
+        for i in range(constants.POSTS_PER_PAGE + 2):
+            Post.objects.create(author=self.user_following, text=str(i))
+        self.assertEqual(len(self.get_timeline_posts()), 3)
+        paginator = timeline.TimelinePaginator(
+            Post.objects.filter(author__following__user=self.user_follower),
+            constants.POSTS_PER_PAGE, user=self.user_follower)
+        first = paginator.get_cursor_page()
+        second = paginator.get_cursor_page(after=first.next_cursor)
+        self.assertEqual(list(first) + list(second),
+                         list(paginator.object_list))
+        self.assertIsNone(second.next_cursor)
+        back = paginator.get_cursor_page(before=second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+
+    @mock.patch.object(constants, 'TIMELINE_MAX_ENTRIES', 3)
+    def test_unfollow_rebuilds_trimmed_timeline(self):
+        """После отписки обрезанная лента снова заполняется постами
+        оставшихся авторов.
+        """
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.user_follower, author=other)
+        Follow.objects.create(
+            user=self.user_follower, author=self.user_following)
+        kept = [Post.objects.create(author=other, text=str(i))
+                for i in range(3)]
+        for i in range(3):
+            Post.objects.create(author=self.user_following, text=str(i))
+        self.assertEqual(len(self.get_timeline_posts()), 3)
+        Follow.objects.filter(author=self.user_following).delete()
+        self.assertEqual(self.get_timeline_posts(), kept[::-1])
+
+
+@mock.patch.object(constants, 'TIMELINE_PUSH_FOLLOWERS_LIMIT', 1)
+class HybridTimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.reader_2 = User.objects.create_user(username='reader_2')
+        cls.author = User.objects.create_user(username='author')
+        cls.celebrity = User.objects.create_user(username='celebrity')
+
+    def setUp(self):
+        cache.clear()
+        for user in (self.reader, self.reader_2):
+            Follow.objects.create(user=user, author=self.celebrity)
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def test_follower_counts_are_kept(self):
+        """Подписки обновляют счётчик подписчиков автора."""
+        stats = UserStats.objects.get(user=self.celebrity)
+        self.assertEqual(stats.followers, 2)
+        Follow.objects.filter(user=self.reader_2).delete()
+        stats.refresh_from_db()
+        self.assertEqual(stats.followers, 1)
+
+    def test_popular_author_posts_are_merged_on_read(self):
+        """Посты популярного автора подмешиваются при чтении."""
+        posts = [
+            Post.objects.create(author=self.author, text='обычный'),
+            Post.objects.create(author=self.celebrity, text='звезда'),
+            Post.objects.create(author=self.author, text='обычный 2'),
+        ]
+        self.assertFalse(TimelineEntry.objects.filter(
+            author=self.celebrity).exists())
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), posts[::-1])
+
+    def test_author_back_under_limit_is_pushed_again(self):
+        """Автор, снова уложившийся в лимит, подмешивается при чтении,
+        пока команда не разложит его посты; отписка ничего не раскладывает.
+        """
+        post = Post.objects.create(author=self.celebrity, text='звезда')
+        leaving = Client()
+        leaving.force_login(self.reader_2)
+        leaving.get(reverse('posts:profile_unfollow',
+                            args=(self.celebrity.username,)))
+        self.assertTrue(
+            UserStats.objects.get(user=self.celebrity).timeline_pulled)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'])
+
+        out = StringIO()
+        call_command('backfill_timelines', stdout=out)
+        self.assertIn('Авторов обработано: 1', out.getvalue())
+        self.assertFalse(
+            UserStats.objects.get(user=self.celebrity).timeline_pulled)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        fresh = Post.objects.create(author=self.celebrity, text='свежий')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=fresh).exists())
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj'])[:2],
+                         [fresh, post])
+
+    def test_benchmark_command_reports_all_modes(self):
+        """Бенчмарк печатает задержки всех режимов и не оставляет данных."""
+        users_count = User.objects.count()
+        out = StringIO()
+        call_command('benchmark_timeline', readers=5, authors=4,
+                     celebrities=1, follows=2, posts=3, samples=2,
+                     stdout=out)
+        for mode in ('pull', 'push', 'hybrid'):
+            self.assertIn(mode, out.getvalue())
+        self.assertEqual(User.objects.count(), users_count)
+        self.assertFalse(UserStats.objects.filter(
+            user__username__startswith='benchmark').exists())
@@ -1,14 +1,17 @@
+import re
 import shutil
 import tempfile
+from http import HTTPStatus
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.test import Client, SimpleTestCase, TestCase, override_settings
 from django.urls import reverse
 
-from ..models import Follow, Group, Post, User
+from .. import checks
+from ..models import Comment, Follow, Group, Post, User
 from ..utils import uploaded_img, constants
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -219,10 +222,10 @@ class PostsPagesTest(TestCase):
     def test_index_cache(self):
         """Главная страница кэшируется"""
         response_first = self.authorized_client.get(reverse('posts:index'))
-        Post.objects.create(
+        Post.objects.bulk_create([Post(
             author=self.user,
             text='test post',
-        )
+        )])
         response_second = self.authorized_client.get(
             (reverse('posts:index'))
         )
@@ -235,6 +238,155 @@ class PostsPagesTest(TestCase):
         self.assertNotEqual(response_first.content,
                             response_after_clear.content)
 
+    def test_new_post_invalidates_cached_pages(self):
+        """Новый пост сразу виден на закэшированных страницах."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+        Post.objects.create(
+            author=self.user, text='свежий пост', group=self.group)
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'свежий пост')
+
+    def test_post_cards_are_shared_between_feeds(self):
+        """Карточка поста кэшируется одна на все ленты до его изменения."""
+        self.authorized_client.get(reverse('posts:index'))
+        Post.objects.filter(pk=self.post.pk).update(text='тихая правка')
+        profile_url = reverse('posts:profile', args=(self.user.username,))
+        response = self.authorized_client.get(profile_url)
+        self.assertContains(response, self.post.text)
+        self.assertNotContains(response, 'тихая правка')
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'новый текст'
+        post.save()
+        response = self.authorized_client.get(profile_url)
+        self.assertContains(response, 'новый текст')
+
+    def test_unchanged_pages_answer_not_modified(self):
+        """Неизменившаяся страница отдаёт 304 без запросов страницы."""
+        # Сессия и пользователь; для поста ещё поиск его автора.
+        urls_queries = {
+            reverse('posts:index'): 2,
+            reverse('posts:group_list', args=(self.group.slug,)): 2,
+            reverse('posts:profile', args=(self.user.username,)): 2,
+            reverse('posts:post_detail', args=(self.post.pk,)): 3,
+        }
+        etags = {}
+        guest_client = Client()
+        for url, queries in urls_queries.items():
+            with self.subTest(url=url):
+                page = self.authorized_client.get(url)
+                etag = etags[url] = page['ETag']
+                with self.assertNumQueries(queries):
+                    response = self.authorized_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+                # ETag меняется вместе с телом: одинаковый ETag — та же
+                # страница, у гостя и ETag, и страница свои.
+                again = self.authorized_client.get(url)
+                self.assertEqual(again['ETag'], etag)
+                self.assertEqual(again.content, page.content)
+                guest_page = guest_client.get(url)
+                self.assertNotEqual(guest_page['ETag'], etag)
+                self.assertNotEqual(guest_page.content, page.content)
+                response = guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=guest_page['ETag'])
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(
+            author=self.user, text='свежий пост', group=self.group)
+        for url in tuple(urls_queries)[:3]:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_cached_pages_are_revalidated_by_clients(self):
+        """Серверный кэш не превращается в кэш браузера на часы."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+            reverse('posts:api_index'),
+            reverse('posts:index_feed', args=('rss',)),
+            reverse('posts:group_index'),
+        )
+        for url in urls:
+            for attempt in ('miss', 'hit'):
+                with self.subTest(url=url, attempt=attempt):
+                    response = self.authorized_client.get(url)
+                    self.assertEqual(response['Cache-Control'],
+                                     'private, no-cache')
+                    self.assertFalse(response.has_header('Expires'))
+
+    def test_cached_pages_are_not_shared_between_viewers(self):
+        """Из кэша читатель получает только свою страницу: своё имя,
+        свои кнопки и CSRF-токен к своей cookie.
+        """
+        cache.clear()
+        bob = User.objects.create_user(username='bob')
+        Follow.objects.create(user=bob, author=self.user)
+        clients = {}
+        for name, user in (('bob', bob), ('anonymous', None),
+                           ('author', self.user)):
+            clients[name] = Client(enforce_csrf_checks=True)
+            if user is not None:
+                clients[name].force_login(user)
+        post_url = reverse('posts:post_detail', args=(self.post.pk,))
+        edit_url = reverse('posts:post_edit', args=(self.post.pk,))
+        unfollow_url = reverse('posts:profile_unfollow',
+                               args=(self.user.username,))
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+            post_url,
+            reverse('posts:search') + '?q=test',
+        )
+        for url in urls:
+            for attempt in ('miss', 'hit'):
+                pages = {name: client.get(url).content.decode()
+                         for name, client in clients.items()}
+                with self.subTest(url=url, attempt=attempt):
+                    self.assertIn('Пользователь: bob', pages['bob'])
+                    self.assertIn(f'Пользователь: {self.user.username}',
+                                  pages['author'])
+                    self.assertNotIn('Пользователь:', pages['anonymous'])
+                    self.assertNotIn(f'Пользователь: {self.user.username}',
+                                     pages['bob'])
+                    self.assertNotIn('Пользователь: bob', pages['author'])
+                    self.assertNotIn(edit_url, pages['bob'])
+                    self.assertNotIn(unfollow_url, pages['anonymous'])
+                    self.assertNotIn(unfollow_url, pages['author'])
+        pages['author'] = clients['author'].get(post_url).content.decode()
+        self.assertIn(edit_url, pages['author'])
+        self.assertIn(unfollow_url, clients['bob'].get(
+            reverse('posts:profile', args=(self.user.username,))
+        ).content.decode())
+        for name in ('author', 'bob'):
+            with self.subTest(comment=name):
+                page = clients[name].get(post_url).content.decode()
+                token = re.search(
+                    r'name="csrfmiddlewaretoken" value="([^"]+)"',
+                    page).group(1)
+                response = clients[name].post(
+                    reverse('posts:add_comment', args=(self.post.pk,)),
+                    {'text': f'от {name}', 'csrfmiddlewaretoken': token})
+                self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_comment_invalidates_post_detail(self):
+        """Новый комментарий сразу виден на странице поста."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.authorized_client.get(url)
+        self.post.comments.create(author=self.user, text='свежий коммент')
+        self.assertContains(self.authorized_client.get(url), 'свежий коммент')
+
 
 class PaginatorViewsTest(TestCase):
     @classmethod
@@ -365,3 +517,64 @@ class FollowTests(TestCase):
         follow.delete()
         response_2 = self.follower_client.get(reverse('posts:follow_index'))
         self.assertEqual(len(response_2.context['page_obj']), 0)
+
+
+class CommentsPageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='commentator')
+        cls.post = Post.objects.create(author=cls.user, text='test post')
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'comment {i}')
+            for i in range(constants.COMMENTS_PER_PAGE + 5)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_post_detail_shows_first_comments_page(self):
+        """На странице поста только первая порция комментариев с авторами."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,)))
+        comments = response.context['comments']
+        self.assertEqual(len(comments), constants.COMMENTS_PER_PAGE)
+        with self.assertNumQueries(0):
+            [comment.author.username for comment in comments]
+        self.assertIsNotNone(comments.next_cursor)
+
+    def test_older_comments_fragment(self):
+        """Старые комментарии отдаются отдельным фрагментом."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,)))
+        cursor = response.context['comments'].next_cursor
+        response = self.client.get(
+            reverse('posts:post_comments', args=(self.post.pk,)),
+            {'after': cursor})
+        self.assertTemplateUsed(response, 'posts/includes/comment_list.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        comments = response.context['comments']
+        self.assertEqual([comment.text for comment in comments],
+                         [f'comment {i}' for i in range(4, -1, -1)])
+        self.assertIsNone(comments.next_cursor)
+
+    def test_comments_fragment_of_missing_post(self):
+        """Фрагмент комментариев несуществующего поста — 404."""
+        response = self.client.get(
+            reverse('posts:post_comments', args=(self.post.pk + 1000,)))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    def test_per_process_cache_is_refused(self):
+        """`check --deploy` не пропускает кэш в памяти процесса."""
+        self.assertEqual(
+            [error.id for error in checks.check_shared_cache(None)],
+            ['posts.E001'])
+        memcached = {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': '127.0.0.1:11211',
+        }
+        with override_settings(CACHES={'default': memcached}):
+            self.assertEqual(checks.check_shared_cache(None), [])
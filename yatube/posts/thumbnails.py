@@ -0,0 +1,219 @@
+import logging
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+
+from django.db import connections, transaction
+from PIL import features
+from sorl.thumbnail import get_thumbnail
+
+from . import constants
+from .caching import bump_versions, post_scope
+from .models import Post
+from .sorl_compat import stored_thumbnails, thumbnail_filename
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+
+
+def get_pool():
+    """Пул процессов-воркеров; создаётся при первой задаче."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=constants.THUMBNAIL_WORKERS,
+            initializer=connections.close_all,
+        )
+    return _pool
+
+
+def variant_format():
+    """Первый из `IMAGE_VARIANT_FORMATS`, который умеет писать Pillow."""
+    for image_format in constants.IMAGE_VARIANT_FORMATS:
+        if image_format != 'WEBP' or features.check('webp'):
+            return image_format
+    return 'JPEG'
+
+
+def variant_geometries():
+    """Геометрии вариантов по ширине с пропорциями карточки."""
+    width, height = constants.IMAGE_VARIANT_ASPECT
+    options = {
+        'crop': 'center',
+        'upscale': False,
+        'format': variant_format(),
+        'quality': constants.IMAGE_VARIANT_QUALITY,
+    }
+    return [
+        (f'{variant}x{round(variant * height / width)}', options)
+        for variant in constants.IMAGE_VARIANT_WIDTHS
+    ]
+
+
+def generate_thumbnails(image_name):
+    """Создаёт миниатюры из шаблонов и варианты для srcset.
+
+    Идёт в воркере и возвращает готовое значение srcset. Варианты не
+    увеличиваются, поэтому у маленьких картинок их меньше.
+    """
+    for geometry, options in constants.THUMBNAIL_GEOMETRIES:
+        get_thumbnail(image_name, geometry, **options)
+    srcset = {}
+    for geometry, options in variant_geometries():
+        variant = get_thumbnail(image_name, geometry, **options)
+        srcset.setdefault(variant.width, variant.url)
+    return ', '.join(
+        f'{url} {width}w' for width, url in sorted(srcset.items()))
+
+
+def generate_in_worker(image_name):
+    try:
+        return generate_thumbnails(image_name)
+    finally:
+        connections.close_all()
+
+
+def save_srcset(post_id, image_name, srcset):
+    """Записывает srcset, если картинку поста тем временем не сменили."""
+    Post.objects.filter(pk=post_id, image=image_name).update(
+        image_srcset=srcset)
+
+
+def _thumbnails_done(post_id, image_name, future):
+    try:
+        save_srcset(post_id, image_name, future.result())
+    except Exception as exception:
+        logger.error('Миниатюры поста %s не созданы: %r', post_id, exception)
+    # Карточки и страницы с исходником вместо миниатюры устарели.
+    bump_versions(post_scope(post_id))
+
+
+def enqueue_thumbnails(post):
+    """После коммита ставит создание миниатюр поста в очередь пула.
+
+    Для уже известной картинки (тот же хэш содержимого) миниатюры
+    готовы: берём srcset другого поста и ничего не генерируем.
+    """
+    if not post.image:
+        return
+    image_name, post_id = post.image.name, post.pk
+    srcset = Post.objects.filter(image=image_name).exclude(
+        image_srcset='').values_list('image_srcset', flat=True).first()
+    if srcset:
+        save_srcset(post_id, image_name, srcset)
+        bump_versions(post_scope(post_id))
+        return
+
+    def submit():
+        future = get_pool().submit(generate_in_worker, image_name)
+        future.add_done_callback(
+            lambda future: _thumbnails_done(post_id, image_name, future))
+
+    transaction.on_commit(submit)
+
+
+class ThumbnailInfo:
+    """Адрес и размеры готовой миниатюры."""
+
+    __slots__ = ('url', 'width', 'height')
+
+    def __init__(self, url, width, height):
+        self.url = url
+        self.width = width
+        self.height = height
+
+
+class LRUCache:
+    """Небольшой LRU-кэш в памяти процесса."""
+
+    __slots__ = ('maxsize', '_data', '_lock')
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+resolved = LRUCache(constants.THUMBNAIL_LRU_SIZE)
+
+
+def thumbnail_name(file_, geometry, options):
+    """Имя файла миниатюры без её создания."""
+    # Воркер получает только имя, то есть хранилище по умолчанию; ключ
+    # миниатюры зависит от хранилища, поэтому считаем его так же.
+    return thumbnail_filename(
+        getattr(file_, 'name', file_), geometry, options)
+
+
+def resolve_thumbnails(names):
+    """Готовые миниатюры по именам файлов: `{имя: ThumbnailInfo}`.
+
+    Сначала смотрит LRU процесса, остальное читает из key-value store
+    sorl разом. Отсутствие миниатюры не запоминается: воркер может
+    создать её в любой момент.
+    """
+    found, missing = {}, []
+    for name in names:
+        info = resolved.get(name)
+        if info is not None:
+            found[name] = info
+        else:
+            missing.append(name)
+    if not missing:
+        return found
+    for name, image in stored_thumbnails(missing).items():
+        info = ThumbnailInfo(image.url, image.width, image.height)
+        resolved.set(name, info)
+        found[name] = info
+    return found
+
+
+def preload_thumbnails(posts):
+    """Разрешает миниатюры всех постов страницы одним заходом.
+
+    Результат, в том числе отсутствие миниатюры, остаётся на файле
+    поста до конца отрисовки, чтобы карточки не спрашивали заново.
+    """
+    images = [
+        (post.image, [
+            thumbnail_name(post.image, geometry, options)
+            for geometry, options in constants.THUMBNAIL_GEOMETRIES
+        ])
+        for post in posts if post.image
+    ]
+    found = resolve_thumbnails(
+        [name for image, names in images for name in names])
+    for image, names in images:
+        image.ready_thumbnails = {name: found.get(name) for name in names}
+
+
+def ready_thumbnail(file_, geometry, **options):
+    """Уже созданная миниатюра (`ThumbnailInfo`) или None; сама ничего
+    не генерирует.
+    """
+    if not file_:
+        return None
+    name = thumbnail_name(file_, geometry, options)
+    preloaded = getattr(file_, 'ready_thumbnails', {})
+    if name in preloaded:
+        return preloaded[name]
+    return resolve_thumbnails([name]).get(name)
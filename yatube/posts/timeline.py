@@ -0,0 +1,259 @@
+import heapq
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from . import constants
+from .models import Follow, Post, TimelineEntry, UserStats
+from .paginators import CachedCountPaginator
+
+
+def make_entry(user_id, post):
+    return TimelineEntry(
+        user_id=user_id,
+        post_id=post.pk,
+        author_id=post.author_id,
+        pub_date=post.pub_date,
+    )
+
+
+def is_pushed(author_id, mode=None, push_limit=None):
+    """Раскладываются ли посты автора по лентам при записи.
+
+    В гибридном режиме посты авторов, у которых подписчиков больше
+    `push_limit` (по умолчанию `TIMELINE_PUSH_FOLLOWERS_LIMIT`) или
+    которые ещё отмечены `timeline_pulled`, не копируются, а
+    подмешиваются при чтении.
+    """
+    mode = mode or constants.TIMELINE_MODE
+    if mode == constants.TIMELINE_PULL:
+        return False
+    if mode == constants.TIMELINE_PUSH:
+        return True
+    if push_limit is None:
+        push_limit = constants.TIMELINE_PUSH_FOLLOWERS_LIMIT
+    followers, pulled = UserStats.objects.filter(
+        user_id=author_id).values_list(
+            'followers', 'timeline_pulled').first() or (0, False)
+    return followers <= push_limit and not pulled
+
+
+def push_post(post, mode=None, push_limit=None):
+    """Кладёт новый пост в ленты всех подписчиков автора.
+
+    Страница подписок потом читает один диапазон индекса
+    `(user, pub_date)` вместо соединения `Follow` и `Post`.
+    """
+    if not is_pushed(post.author_id, mode, push_limit):
+        return
+    followers = list(Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True))
+    TimelineEntry.objects.bulk_create(
+        (make_entry(user_id, post) for user_id in followers),
+        ignore_conflicts=True,
+    )
+    for user_id in followers:
+        trim(user_id)
+
+
+def backfill(user_id, author_id, mode=None, push_limit=None):
+    """Добавляет в ленту свежие посты автора после подписки."""
+    if not is_pushed(author_id, mode, push_limit):
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id').only('id', 'author_id', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        (make_entry(user_id, post)
+         for post in posts[:constants.TIMELINE_MAX_ENTRIES]),
+        ignore_conflicts=True,
+    )
+    trim(user_id)
+
+
+def follower_lost(author_id, mode=None, push_limit=None):
+    """Отмечает автора, который после отписки снова укладывается в
+    лимит гибридного режима.
+
+    Пока подписчиков было больше лимита, его посты подмешивались при
+    чтении и в ленты не попадали. Разложить их по лентам всех
+    подписчиков в запросе отписки слишком дорого, поэтому автор
+    остаётся подмешиваемым (`timeline_pulled`), пока это не сделает
+    `backfill_pulled` из команды `backfill_timelines`.
+    """
+    mode = mode or constants.TIMELINE_MODE
+    if push_limit is None:
+        push_limit = constants.TIMELINE_PUSH_FOLLOWERS_LIMIT
+    if mode == constants.TIMELINE_HYBRID:
+        UserStats.objects.filter(
+            user_id=author_id, followers=push_limit).update(
+                timeline_pulled=True)
+
+
+def backfill_pulled(author_id, push_limit=None):
+    """Раскладывает посты отмеченного автора по лентам подписчиков и
+    снимает отметку `timeline_pulled`.
+
+    Отметка снимается в той же транзакции до раскладки: новые посты
+    после неё раскладываются при записи, старые — здесь. Автор, у
+    которого подписчиков опять больше лимита, подмешивается по
+    счётчику и раскладки не требует.
+    """
+    if push_limit is None:
+        push_limit = constants.TIMELINE_PUSH_FOLLOWERS_LIMIT
+    with transaction.atomic():
+        stats = UserStats.objects.select_for_update().filter(
+            user_id=author_id, timeline_pulled=True).first()
+        if stats is None:
+            return
+        stats.timeline_pulled = False
+        stats.save(update_fields=['timeline_pulled'])
+        if stats.followers > push_limit:
+            return
+        followers = Follow.objects.filter(
+            author_id=author_id).values_list('user_id', flat=True)
+        for user_id in followers.iterator():
+            backfill(user_id, author_id, constants.TIMELINE_PUSH)
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты посты автора после отписки.
+
+    Обрезанной ленте после этого не хватает старых постов других
+    авторов, поэтому она собирается заново.
+    """
+    was_full = is_full(user_id)
+    TimelineEntry.objects.filter(
+        user_id=user_id, author_id=author_id).delete()
+    if was_full:
+        rebuild([user_id])
+
+
+def is_full(user_id):
+    """Лента дошла до `TIMELINE_MAX_ENTRIES`: `trim` могла срезать её
+    хвост.
+    """
+    return TimelineEntry.objects.filter(user_id=user_id).order_by()[
+        constants.TIMELINE_MAX_ENTRIES - 1:].exists()
+
+
+def trim(user_id, limit=None):
+    """Оставляет в ленте только `limit` (по умолчанию
+    `TIMELINE_MAX_ENTRIES`) самых свежих записей.
+    """
+    if limit is None:
+        limit = constants.TIMELINE_MAX_ENTRIES
+    entries = TimelineEntry.objects.filter(user_id=user_id)
+    boundary = entries.order_by('-pub_date', '-post_id').values_list(
+        'pub_date', 'post_id')[limit:limit + 1]
+    boundary = list(boundary)
+    if not boundary:
+        return
+    pub_date, post_id = boundary[0]
+    entries.filter(
+        Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, post_id__lte=post_id)
+    ).delete()
+
+
+def rebuild(user_ids=None, mode=None, push_limit=None):
+    """Заново собирает ленты по текущим подпискам."""
+    follows = Follow.objects.all()
+    if user_ids is not None:
+        follows = follows.filter(user_id__in=user_ids)
+        TimelineEntry.objects.filter(user_id__in=user_ids).delete()
+    else:
+        TimelineEntry.objects.all().delete()
+    for user_id, author_id in follows.values_list('user_id', 'author_id'):
+        backfill(user_id, author_id, mode, push_limit)
+
+
+class TimelinePaginator(CachedCountPaginator):
+    """Лента подписок: готовые записи ленты плюс посты «звёзд».
+
+    `object_list` — обычный запрос по подпискам; он нужен для номеров
+    страниц и подсчёта. Страницы по курсору собираются слиянием
+    записей `TimelineEntry` и постов авторов, которые не раскладываются
+    по лентам (см. `is_pushed`). Посты каждого такого автора читаются
+    отдельным запросом по индексу `(author, pub_date)`: запрос с
+    `author IN (...)` пришлось бы сортировать целиком.
+
+    Лента хранит только `TIMELINE_MAX_ENTRIES` записей, поэтому за её
+    концом страницы дочитываются из `object_list`: курсоры проходят
+    те же посты, что номера страниц и счётчик.
+    """
+
+    def __init__(self, object_list, per_page, user=None, mode=None,
+                 push_limit=None, **kwargs):
+        self.user = user
+        self.mode = mode or constants.TIMELINE_MODE
+        if push_limit is None:
+            push_limit = constants.TIMELINE_PUSH_FOLLOWERS_LIMIT
+        self.push_limit = push_limit
+        super().__init__(object_list, per_page, **kwargs)
+
+    @cached_property
+    def pulled_author_ids(self):
+        follows = Follow.objects.filter(user=self.user)
+        if self.mode == constants.TIMELINE_HYBRID:
+            follows = follows.filter(
+                Q(author__stats__followers__gt=self.push_limit)
+                | Q(author__stats__timeline_pulled=True))
+        return list(follows.values_list('author_id', flat=True))
+
+    @cached_property
+    def oldest_entry(self):
+        """Ключи самой старой записи ленты или None для пустой ленты."""
+        return TimelineEntry.objects.filter(user=self.user).order_by(
+            'pub_date', 'post_id').values_list('pub_date', 'post_id').first()
+
+    @cached_property
+    def truncated(self):
+        return is_full(self.user.pk)
+
+    def beyond_timeline(self, values):
+        """Курсор старше всех записей обрезанной ленты."""
+        if values is None or not self.truncated:
+            return False
+        oldest = self.oldest_entry
+        return oldest is not None and tuple(values) <= oldest
+
+    def _fetch(self, values, forward, limit):
+        if self.mode == constants.TIMELINE_PULL:
+            return super()._fetch(values, forward, limit)
+        older = forward == self.descending
+        if not older and self.beyond_timeline(values):
+            return super()._fetch(values, forward, limit)
+        entries = self.seek(
+            TimelineEntry.objects.filter(user=self.user).select_related(
+                'post__author', 'post__group'),
+            values, forward, keys=('pub_date', 'post_id'))
+        posts = [entry.post for entry in entries[:limit]]
+        if older and len(posts) < limit and self.truncated:
+            # Обрезанная лента кончилась: остальное знает только полный
+            # запрос.
+            return super()._fetch(values, forward, limit)
+        if self.mode == constants.TIMELINE_PUSH or not self.pulled_author_ids:
+            return posts
+        sources = [posts]
+        for author_id in self.pulled_author_ids:
+            pulled = self.seek(
+                Post.objects.filter(author_id=author_id).select_related(
+                    'author', 'group'),
+                values, forward)
+            sources.append(list(pulled[:limit]))
+        merged = heapq.merge(
+            *sources,
+            key=lambda post: (post.pub_date, post.pk),
+            reverse=older,
+        )
+        return list(islice(unique_posts(merged), limit))
+
+
+def unique_posts(posts):
+    """Пропускает посты, которые уже попали в ленту из другого источника."""
+    seen = set()
+    for post in posts:
+        if post.pk not in seen:
+            seen.add(post.pk)
+            yield post
@@ -1,13 +1,35 @@
 from django.urls import path
 
-from . import views
+from . import api, feeds, views
 
 app_name = 'posts'
 
 urlpatterns = [
+    path('group/', views.group_index, name='group_index'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('feed/<str:kind>/', feeds.index_feed, name='index_feed'),
+    path('group/<slug:slug>/feed/<str:kind>/',
+         feeds.group_feed,
+         name='group_feed'
+         ),
+    path('profile/<str:username>/feed/<str:kind>/',
+         feeds.profile_feed,
+         name='profile_feed'
+         ),
+    path('group/<slug:slug>/export/',
+         views.group_export,
+         name='group_export'
+         ),
+    path('profile/<str:username>/export/',
+         views.profile_export,
+         name='profile_export'
+         ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('posts/<int:post_id>/comments/',
+         views.post_comments,
+         name='post_comments'
+         ),
     path('posts/<int:post_id>/comment/',
          views.add_comment,
          name='add_comment'
@@ -16,6 +38,20 @@ urlpatterns = [
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('', views.index, name='index'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
+    path('api/v1/posts/', api.api_index, name='api_index'),
+    path('api/v1/group/<slug:slug>/',
+         api.api_group_posts,
+         name='api_group_list'
+         ),
+    path('api/v1/profile/<str:username>/',
+         api.api_profile,
+         name='api_profile'
+         ),
+    path('api/v1/posts/<int:post_id>/',
+         api.api_post_detail,
+         name='api_post_detail'
+         ),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -1,18 +1,44 @@
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.core.paginator import Paginator
 
 from . import constants
+from .models import Comment
+from .paginators import CachedCountPaginator, KeysetPaginator
 
 
-def get_page_context(post_list, request):
-    """Пагинация для шаблонов страниц."""
-    paginator = Paginator(post_list, constants.POSTS_PER_PAGE)
+def get_page_context(post_list, request, count_key=None,
+                     paginator_class=CachedCountPaginator, **kwargs):
+    """Пагинация для шаблонов страниц.
+
+    Основной режим — курсоры `?after=`/`?before=`; старые ссылки
+    вида `?page=N` продолжают работать. Количество постов берётся
+    из кэша по `count_key`.
+    """
+    paginator = paginator_class(
+        post_list, constants.POSTS_PER_PAGE, count_key=count_key, **kwargs)
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    if page_number is not None:
+        return paginator.get_page(page_number)
+    page_obj = paginator.get_cursor_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
 
     return page_obj
 
 
+def get_comments_page(post_id, after=None):
+    """Страница комментариев поста, от новых к старым.
+
+    Автор подгружается тем же запросом; более старые комментарии
+    листаются курсором `after`.
+    """
+    comments = Comment.objects.filter(
+        post_id=post_id).select_related('author')
+    paginator = KeysetPaginator(
+        comments, constants.COMMENTS_PER_PAGE, keys=('-created', '-id'))
+    return paginator.get_cursor_page(after=after)
+
+
 small_gif = (
     b'\x47\x49\x46\x38\x39\x61\x02\x00'
     b'\x01\x00\x80\x00\x00\x00\x00\x00'
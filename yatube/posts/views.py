@@ -1,29 +1,52 @@
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import (Http404, HttpResponseBadRequest,
+                         HttpResponseForbidden, StreamingHttpResponse)
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+
+from core.query_budget import query_budget
 
 from . import constants
+from .caching import author_scope, cache_versioned, group_scope, post_scope
+from .export import CONTENT_TYPES, WRITERS, export_records, image_storage_url
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utils import get_page_context
+from .models import Follow, Group, GroupStats, Post, User
+from .paginators import feed_count_key
+from .search import search_posts
+from .stats import get_user_stats
+from .thumbnails import enqueue_thumbnails
+from .timeline import TimelinePaginator
+from .utils import get_comments_page, get_page_context
+
 
+def post_detail_scopes(post_id):
+    author = Post.objects.filter(pk=post_id).values_list(
+        'author__username', flat=True).first()
+    return post_scope(post_id), author_scope(author)
 
-@cache_page(constants.CASH_TIME_FOR_INDEX_PAGE_IN_SECONDS)
+
+@query_budget(6)
+@cache_versioned(lambda: ('index',))
 def index(request):
     """Выводит шаблон главной страницы."""
     post_list = Post.objects.select_related('author', 'group')
-    page_obj = get_page_context(post_list, request)
+    page_obj = get_page_context(
+        post_list, request, feed_count_key('index'))
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@query_budget(6)
+@cache_versioned(lambda slug: (group_scope(slug),))
 def group_posts(request, slug):
     """Выводит шаблон с постами группы."""
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    page_obj = get_page_context(post_list, request)
+    post_list = group.posts.select_related('author')
+    page_obj = get_page_context(
+        post_list, request, feed_count_key('group', group.pk))
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -31,27 +54,59 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+# Сортировки каталога групп; для каждой есть индекс `GroupStats`.
+GROUP_ORDERINGS = {
+    'active': ('-recent_posts', '-last_post', 'pk'),
+    'new': ('-last_post', 'pk'),
+}
+
+
+@query_budget(4)
+@cache_versioned(lambda: ('index',))
+def group_index(request):
+    """Каталог групп по активности из заранее посчитанной статистики."""
+    sort = request.GET.get('sort')
+    if sort not in GROUP_ORDERINGS:
+        sort = 'active'
+    stats = GroupStats.objects.select_related('group').order_by(
+        *GROUP_ORDERINGS[sort])
+    page_obj = Paginator(stats, constants.GROUPS_PER_PAGE).get_page(
+        request.GET.get('page'))
+    context = {
+        'page_obj': page_obj,
+        'sort': sort,
+    }
+    return render(request, 'posts/group_index.html', context)
+
+
+@query_budget(7)
+@cache_versioned(lambda username: (author_scope(username),))
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    page_obj = get_page_context(post_list, request)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    post_list = author.posts.select_related('group')
+    page_obj = get_page_context(
+        post_list, request, feed_count_key('author', author.pk))
     following = (request.user.is_authenticated
                  and Follow.objects.filter(
                      user=request.user, author=author,).exists())
     context = {
         'author': author,
+        'stats': get_user_stats(author),
         'page_obj': page_obj,
         'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@query_budget(6)
+@cache_versioned(post_detail_scopes)
 def post_detail(request, post_id):
     """Выводит страницу отдельно взятого поста."""
     post_object = get_object_or_404(Post.objects.select_related(
-        'group', 'author'), id=post_id)
-    comments = post_object.comments.all()
-    count = post_object.author.posts.count()
+        'group', 'author', 'author__stats'), id=post_id)
+    comments = get_comments_page(post_id)
+    count = get_user_stats(post_object.author).posts
     form = CommentForm(request.POST or None)
     context = {
         'post': post_object,
@@ -62,7 +117,36 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+@query_budget(4)
+@cache_versioned(lambda post_id: (post_scope(post_id),),
+                 personal=False)
+def post_comments(request, post_id):
+    """Фрагмент со следующей порцией более старых комментариев."""
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    context = {
+        'post_id': post_id,
+        'comments': get_comments_page(post_id, request.GET.get('after')),
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
+@query_budget(5)
+@cache_versioned(lambda: ('index',))
+def search(request):
+    """Полнотекстовый поиск по постам."""
+    query = request.GET.get('q', '').strip()
+    page_obj = search_posts(query, request.GET.get('after')) if query else []
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+# Без бюджета: раздача поста в ленты растёт с числом подписчиков.
 @login_required
+@transaction.atomic
 def post_create(request):
     """Возможность создать новый пост для авторизованного пользователя."""
     form = PostForm(request.POST or None,
@@ -71,6 +155,7 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        enqueue_thumbnails(post)
         return redirect('posts:profile', request.user.username)
     context = {
         'form': form
@@ -78,6 +163,7 @@ def post_create(request):
     return render(request, 'posts/create_post.html', context)
 
 
+@query_budget(18)
 @login_required
 def post_edit(request, post_id):
     """Возможность редактировать пост для авторизованного пользователя."""
@@ -92,7 +178,14 @@ def post_edit(request, post_id):
                     files=request.FILES or None,
                     instance=post_object)
     if form.is_valid():
-        form.save()
+        post = form.save(commit=False)
+        fields = list(PostForm.Meta.fields)
+        if 'image' in form.changed_data:
+            post.image_srcset = ''
+            fields.append('image_srcset')
+        post.save(update_fields=fields)
+        if 'image' in form.changed_data:
+            enqueue_thumbnails(post)
         return redirect('posts:post_edit', post_id)
     form = PostForm(instance=post_object)
     context = {
@@ -103,7 +196,9 @@ def post_edit(request, post_id):
     return render(request, 'posts/create_post.html', context)
 
 
+@query_budget(11)
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     """Возможность оставлять комментарии для авторизованного пользователя."""
     post_object = get_object_or_404(Post, id=post_id)
@@ -116,12 +211,16 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(7)
 @login_required
 def follow_index(request):
     """Выводит посты авторов, на которых подписан пользователь."""
     author = request.user
-    post_list = Post.objects.filter(author__following__user=author)
-    page_obj = get_page_context(post_list, request)
+    post_list = Post.objects.filter(
+        author__following__user=author).select_related('author', 'group')
+    page_obj = get_page_context(
+        post_list, request, feed_count_key('follow', author.pk),
+        paginator_class=TimelinePaginator, user=author)
     context = {
         'author': author,
         'page_obj': page_obj,
@@ -129,23 +228,68 @@ def follow_index(request):
     return render(request, 'posts/follow.html', context)
 
 
+@query_budget(16)
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     """Возможность подписаться на автора."""
     user = request.user
     author = User.objects.get(username=username)
-    is_follower = Follow.objects.filter(user=request.user, author=author)
-    if user != author and not is_follower.exists():
-        Follow.objects.create(user=user, author=author)
+    if user != author:
+        Follow.objects.get_or_create(user=user, author=author)
     return redirect('posts:profile', username=author)
 
 
+@query_budget(13)
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     """Возможность отписаться от автора."""
     user = request.user
     author = get_object_or_404(User, username=username)
-    follow = Follow.objects.filter(user=user, author=author).count()
-    if user != author and follow:
-        Follow.objects.filter(user=user, author=author).delete()
+    Follow.objects.filter(user=user, author=author).delete()
     return redirect('posts:profile', username=username)
+
+
+def export_response(request, posts, filename):
+    """Потоковая выгрузка постов в JSONL (по умолчанию) или CSV.
+
+    `?comments=1` добавляет комментарии, `?images=1` — ссылки на
+    картинки.
+    """
+    file_format = request.GET.get('format', 'jsonl')
+    if file_format not in WRITERS:
+        return HttpResponseBadRequest('Неизвестный формат выгрузки.')
+    image_url = None
+    if request.GET.get('images'):
+        def image_url(name):
+            return request.build_absolute_uri(image_storage_url(name))
+    records = export_records(
+        posts, comments=bool(request.GET.get('comments')),
+        image_url=image_url)
+    response = StreamingHttpResponse(
+        WRITERS[file_format](records),
+        content_type=f'{CONTENT_TYPES[file_format]}; charset=utf-8')
+    response['Content-Disposition'] = (
+        f'attachment; filename="{filename}.{file_format}"')
+    return response
+
+
+# Без бюджета: выгрузка читается потоком уже после возврата из view.
+@login_required
+def profile_export(request, username):
+    """Выгрузка постов автора: для него самого и для персонала."""
+    author = get_object_or_404(User, username=username)
+    if request.user != author and not request.user.is_staff:
+        return HttpResponseForbidden('Нет доступа к выгрузке.')
+    return export_response(
+        request, author.posts.all(), f'posts-{author.username}')
+
+
+@login_required
+def group_export(request, slug):
+    """Выгрузка постов группы, только для персонала."""
+    if not request.user.is_staff:
+        return HttpResponseForbidden('Нет доступа к выгрузке.')
+    group = get_object_or_404(Group, slug=slug)
+    return export_response(request, group.posts.all(), f'posts-{group.slug}')